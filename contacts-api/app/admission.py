@@ -0,0 +1,163 @@
+"""
+Контроль допуску запитів (load shedding) за класами маршрутів.
+
+Кожен клас маршрутів — вхід (bcrypt), читання, поодинокі зміни і масові
+операції — має власну межу одночасних запитів і обмежену чергу. bcrypt
+виконується в пулі потоків (``run_in_threadpool`` в ``app.main``), тож межа
+класу ``auth`` обмежує кількість одночасних хешувань, а цикл подій тим часом
+обслуговує інші класи. Запит, для
+якого черга вже заповнена або який простояв у ній довше ``queue_timeout``,
+одразу отримує ``503`` із заголовком ``Retry-After`` замість того, щоб чекати
+на пул підключень чи процесор разом з усіма. Так перевантаження одного класу
+(наприклад, хвиля входів) не збільшує затримку інших, а затримка прийнятих
+запитів обмежена часом у черзі та обробки.
+
+Клас маршруту також задає ``statement_timeout`` для запитів до бази: значення
+передається в ``get_db`` через ``app.database.route_statement_timeout``.
+
+Межі діють у кожному воркері окремо.
+"""
+import asyncio
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.config import get_settings
+from app.database import route_statement_timeout
+
+# SQLSTATE query_canceled: PostgreSQL перервав запит через statement_timeout
+QUERY_CANCELED = "57014"
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    # Скільки запитів класу обробляється одночасно
+    concurrency: int
+    # Скільки запитів може чекати на вільне місце; решта відхиляється одразу
+    queue: int
+    # Найдовше очікування в черзі, секунди
+    queue_timeout: float
+    # statement_timeout для запитів класу, секунди; None — типове значення рушія
+    statement_timeout: Optional[float] = None
+
+
+# Разом класи, що звертаються до бази, тримають не більше підключень, ніж є в
+# пулі за замовчуванням (pool_size 5 + max_overflow 10); вхід обмежений сильніше,
+# бо bcrypt займає процесор воркера
+ROUTE_CLASSES: Dict[str, RouteClass] = {
+    route_class.name: route_class for route_class in (
+        RouteClass("auth", concurrency=2, queue=16, queue_timeout=1.0),
+        RouteClass("reads", concurrency=8, queue=32, queue_timeout=0.5),
+        RouteClass("writes", concurrency=4, queue=16, queue_timeout=1.0),
+        RouteClass("bulk", concurrency=1, queue=2, queue_timeout=5.0, statement_timeout=30.0),
+    )
+}
+
+# ``/token/refresh`` не перевіряє пароль і належить до ``writes``: хвиля входів
+# не повинна відкидати дешеве оновлення, яке дозволяє клієнтам обійтися без bcrypt
+AUTH_PATHS = {"/register", "/token", "/password/reset/request", "/reset-password"}
+BULK_ROUTES = {("POST", "/contacts/import"), ("POST", "/contacts/tags"), ("DELETE", "/contacts/tags")}
+# Перевірку готовності не відкидаємо: балансувальник сам знімає воркер, якщо вона повільна
+EXEMPT_PATHS = {"/healthz"}
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """
+    Визначає клас маршруту запиту.
+
+    :param method: HTTP-метод
+    :param path: Шлях запиту
+    :return: Назва класу або ``None`` для маршрутів без контролю допуску
+    """
+    if path in EXEMPT_PATHS:
+        return None
+    if path in AUTH_PATHS:
+        return "auth"
+    if (method, path) in BULK_ROUTES:
+        return "bulk"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "reads"
+    return "writes"
+
+
+def overloaded_response(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Server is overloaded, retry later"},
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class _Gate:
+    def __init__(self, route_class: RouteClass):
+        self.route_class = route_class
+        self.semaphore = asyncio.Semaphore(route_class.concurrency)
+        self.waiting = 0
+
+    async def acquire(self) -> bool:
+        if self.semaphore.locked() and self.waiting >= self.route_class.queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.route_class.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        self.semaphore.release()
+
+
+class AdmissionControl:
+    """
+    ASGI-middleware, що обмежує кількість одночасних запитів кожного класу маршрутів.
+
+    Реалізоване на рівні ASGI, а не ``BaseHTTPMiddleware``: відхилений запит не
+    створює задач і не читає тіло.
+
+    :param app: Наступний ASGI-застосунок
+    :param route_classes: Класи маршрутів; за замовчуванням ``ROUTE_CLASSES``
+    """
+
+    def __init__(self, app, route_classes: Optional[Dict[str, RouteClass]] = None):
+        self.app = app
+        self.gates = {name: _Gate(route_class) for name, route_class in (route_classes or ROUTE_CLASSES).items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().admission_control:
+            await self.app(scope, receive, send)
+            return
+        gate = self.gates.get(classify(scope["method"], scope["path"]))
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire():
+            await overloaded_response(gate.route_class.queue_timeout)(scope, receive, send)
+            return
+        token = route_statement_timeout.set(gate.route_class.statement_timeout)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_statement_timeout.reset(token)
+            gate.release()
+
+
+async def database_overload_handler(request: Request, exc: Exception):
+    """
+    Перетворює вичерпаний пул підключень і перерваний за ``statement_timeout`` запит на ``503``.
+
+    Інші помилки бази передаються далі і стають ``500``.
+    """
+    if isinstance(exc, PoolTimeoutError):
+        return overloaded_response(get_settings().db_pool_timeout)
+    if isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED:
+        return overloaded_response(1)
+    raise exc
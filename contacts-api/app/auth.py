@@ -1,16 +1,27 @@
+import os
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
-SECRET_KEY = "9smP3~7sMg4kCVfUFc&2!t7;3(LU4"
+SECRET_KEY = os.getenv("SECRET_KEY", "9smP3~7sMg4kCVfUFc&2!t7;3(LU4")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache
+def get_pwd_context():
+    """
+    Повертає контекст хешування паролів, створюючи його під час першого виклику.
+
+    :return: Екземпляр ``CryptContext``
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class AuthService:
@@ -38,11 +49,11 @@ class TokenData(BaseModel):
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -59,7 +70,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    # Тип відрізняє refresh-токен від токена доступу: він не дає доступу до API
+    to_encode.update({"exp": expire, "typ": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
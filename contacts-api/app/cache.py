@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+Loader = Callable[[], Awaitable[Any]]
+
+# Записи на кожне звернення до кешу; вибіркові, див. app.log.SamplingFilter
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Об'єднує одночасні виклики з однаковим ключем в один.
+
+    Перший виклик запускає завантажувач в окремій задачі, і всі виклики, разом
+    з першим, чекають на неї через ``asyncio.shield``: скасування одного з них
+    (клієнт від'єднався, спрацював тайм-аут) не скасовує завантаження для решти.
+    Якщо скасовано всі виклики, завантаження все одно завершиться, а результат
+    буде відкинуто.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, loader: Loader) -> Any:
+        """
+        Виконує ``loader`` або приєднується до виконання, що вже триває.
+
+        :param key: Ключ, за яким об'єднуються виклики
+        :param loader: Корутина-завантажувач
+        :return: Результат завантажувача
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Позначаємо виняток як отриманий, навіть якщо всі очікувачі вже скасовані
+            task.exception()
+
+
+class CoalescingCache:
+    """
+    Кеш поверх бекенду ``fastapi_cache`` із захистом від «thundering herd».
+
+    * Одночасні промахи за одним ключем чекають на одне завантаження (``SingleFlight``).
+    * Після ``ttl`` запис ще ``stale_ttl`` секунд віддається як застарілий, а
+      оновлення виконується у фоні (stale-while-revalidate).
+    * Ймовірнісне дострокове оновлення (XFetch): чим ближче кінець ``ttl`` і чим
+      довше триває завантаження, тим імовірніше запит оновить запис заздалегідь.
+      ``beta = 0`` вимикає дострокове оновлення.
+    * Результат ``None`` («не знайдено») не зберігається; одночасні промахи
+      все одно об'єднуються в одне завантаження.
+    """
+
+    def __init__(self, backend, prefix: str = "cache", ttl: int = 60, stale_ttl: int = 0, beta: float = 1.0,
+                 clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.clock = clock
+        self._flight = SingleFlight()
+        self._refreshes: Set[asyncio.Task] = set()
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def _load(self, key: str, loader: Loader, ttl: int) -> Any:
+        started = self.clock()
+        value = jsonable_encoder(await loader())
+        if value is None:
+            # Відсутність запису не кешується: інакше створений пізніше запис
+            # лишався б невидимим до кінця ttl + stale_ttl
+            return value
+        now = self.clock()
+        entry = {"v": value, "e": now + ttl, "d": now - started}
+        await self.backend.set(self._key(key), json.dumps(entry).encode(), expire=ttl + self.stale_ttl)
+        return value
+
+    def _refresh_in_background(self, key: str, loader: Loader, ttl: int) -> None:
+        if self._flight.in_flight(key):
+            return
+        task = asyncio.create_task(self._flight.do(key, lambda: self._load(key, loader, ttl)))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshes.discard(task)
+        if not task.cancelled():
+            # Помилка фонового оновлення не повинна ламати запит; запис оновиться наступного разу
+            task.exception()
+
+    def _expires_early(self, entry: dict, now: float) -> bool:
+        if self.beta <= 0:
+            return False
+        return now - entry["d"] * self.beta * math.log(1.0 - random.random()) >= entry["e"]
+
+    async def get_or_load(self, key: str, loader: Loader, ttl: Optional[int] = None) -> Any:
+        """
+        Повертає значення з кешу або завантажує його один раз для всіх одночасних запитів.
+
+        :param key: Ключ кешу без префікса
+        :param loader: Корутина, що завантажує значення, серіалізоване в JSON, або ``None``, якщо його немає
+        :param ttl: Час життя запису; за замовчуванням ``self.ttl``
+        :return: Значення з кешу або результат ``loader``
+        """
+        ttl = self.ttl if ttl is None else ttl
+        raw = await self.backend.get(self._key(key))
+        if raw is not None:
+            entry = json.loads(raw)
+            now = self.clock()
+            if now < entry["e"] and not self._expires_early(entry, now):
+                logger.debug("cache hit %s", key)
+                return entry["v"]
+            if self.stale_ttl > 0:
+                logger.debug("cache stale %s, refreshing in background", key)
+                self._refresh_in_background(key, loader, ttl)
+                return entry["v"]
+        logger.debug("cache miss %s", key)
+        return await self._flight.do(key, lambda: self._load(key, loader, ttl))
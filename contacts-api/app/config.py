@@ -1,20 +1,71 @@
-from pydantic_settings import BaseSettings
-import os
-import sys
-
-sys.path.insert(0, os.path.abspath('../'))
-
-
-class Settings(BaseSettings):
-    database_url: str
-
-    class Config:
-        env_file = ".env"
-
-
-extensions = [
-    'sphinx.ext.autodoc',
-    'sphinx.ext.napoleon',
-]
-
-settings = Settings()
+from typing import Optional
+
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    database_url: str
+    # SQL-запити пишуться в лог sqlalchemy.engine через чергу app.log; вибірково, див. log_sample_rate
+    db_echo: bool = False
+    # Типовий statement_timeout на PostgreSQL, секунди; класи маршрутів можуть
+    # задати інший (app/admission.py)
+    db_statement_timeout: float = 5.0
+    # Скільки запит чекає на вільне підключення пулу, перш ніж отримати 503
+    db_pool_timeout: float = 5.0
+    # Контроль допуску: межі одночасних запитів і черги за класами маршрутів
+    admission_control: bool = True
+    # Кількість хеш-секцій таблиці contacts на PostgreSQL; 0 — звичайна таблиця
+    contacts_partitions: int = 0
+    redis_url: str = "redis://localhost"
+    # Сховище лічильників rate limit; за замовчуванням спільний Redis, щоб ліміти
+    # діяли на всі воркери разом, а не на кожен процес окремо.
+    rate_limit_storage_uri: Optional[str] = None
+    # Кеш читання: час життя запису і скільки ще секунд віддавати застарілий запис,
+    # поки він оновлюється у фоні
+    cache_ttl: int = 60
+    cache_stale_ttl: int = 30
+
+    mail_username: Optional[str] = None
+    mail_password: Optional[str] = None
+    mail_from: Optional[str] = None
+    mail_port: int = 587
+    mail_server: Optional[str] = None
+    mail_starttls: bool = True
+    mail_ssl_tls: bool = False
+
+    cloudinary_url: Optional[str] = None
+
+    log_level: str = "INFO"
+    # Частка запитів, для яких пишуться DEBUG-записи і SQL (app/log.py)
+    log_sample_rate: float = 0.01
+
+    class Config:
+        env_file = ".env"
+
+
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """
+    Повертає налаштування застосунку.
+
+    Налаштування читаються з оточення та ``.env`` лише під час першого виклику,
+    а не під час імпорту модуля.
+
+    :return: Екземпляр ``Settings``
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def configure_settings(settings: Optional[Settings]) -> None:
+    """
+    Встановлює налаштування, які повертатиме ``get_settings``.
+
+    :param settings: Налаштування або ``None``, щоб перечитати їх з оточення
+    """
+    global _settings
+    _settings = settings
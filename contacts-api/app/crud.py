@@ -1,39 +1,216 @@
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Integer, String, any_, bindparam, delete, func, insert, literal, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import Contact
+from app.models import Contact, ContactTag, Tag
+from app.pagination import Cursor
 from app.schemas import ContactCreate, ContactUpdate
 
 
-async def get_contact(db: AsyncSession, contact_id: int):
-    return await db.get(Contact, contact_id)
+# Кожен запит фільтрує за ``Contact.user_email`` — ключем секціонування таблиці
+# contacts (див. app/partitioning.py), тому PostgreSQL читає лише секцію власника.
+#
+# Функції не фіксують транзакцію: нею керує ``get_db`` (одна транзакція на запит).
+# Зміни повертають рядок через ``RETURNING`` в тому самому запиті, без ``refresh``.
+
+def _in_list(db: AsyncSession, column, name: str, values: Sequence, item_type):
+    # На PostgreSQL список передається одним параметром-масивом (``column = ANY(:name)``),
+    # тож текст запиту не залежить від кількості значень; на інших СУБД — ``IN``
+    if db.bind.dialect.name == "postgresql":
+        return column == any_(bindparam(name, list(values), type_=ARRAY(item_type)))
+    return column.in_(list(values))
+
+
+async def get_contact(db: AsyncSession, contact_id: int, user_email: str):
+    result = await db.execute(select(Contact).where(Contact.user_email == user_email, Contact.id == contact_id))
+    return result.scalars().first()
+
+
+def _tagged_contact_ids(db: AsyncSession, user_email: str, tags: Sequence[str], match_all: bool):
+    query = (
+        select(ContactTag.contact_id)
+        .join(Tag, Tag.id == ContactTag.tag_id)
+        .where(ContactTag.user_email == user_email, Tag.user_email == user_email,
+               _in_list(db, Tag.name, "tag_names", tags, String))
+    )
+    if match_all:
+        # Назви міток унікальні в межах власника, а пара (мітка, контакт) — в contact_tags
+        query = query.group_by(ContactTag.contact_id).having(func.count() == len(tags))
+    return query
+
+
+async def get_contacts(db: AsyncSession, user_email: str, skip: int = 0, limit: int = 10,
+                       tags: Optional[Sequence[str]] = None, match_all: bool = False,
+                       after: Optional[Cursor] = None):
+    """
+    Повертає сторінку контактів власника, упорядкованих за прізвищем, іменем та id.
 
+    Порядок збігається з індексом ``ix_contacts_owner_name``, тому сторінка
+    читається з індексу без сортування. Фільтр за мітками — напівз'єднання з
+    contact_tags: для кожного контакту перевіряється індекс
+    ``ix_contact_tags_owner_contact``, або, якщо мітка рідкісна, планувальник
+    починає з первинного ключа contact_tags.
 
-async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 10):
-    result = await db.execute(select(Contact).offset(skip).limit(limit))
+    :param db: Сесія бази даних
+    :param user_email: Email власника контактів
+    :param skip: Кількість пропущених контактів (для курсора зазвичай 0)
+    :param limit: Розмір сторінки
+    :param tags: Назви міток; ``None`` або порожній список — без фільтра
+    :param match_all: Контакт має мати всі мітки, а не хоча б одну
+    :param after: Курсор: повертаються контакти після цього ключа сортування
+    :return: Контакти сторінки
+    """
+    query = select(Contact).where(Contact.user_email == user_email)
+    if tags:
+        tags = list(dict.fromkeys(tags))
+        query = query.where(Contact.id.in_(_tagged_contact_ids(db, user_email, tags, match_all)))
+    if after is not None:
+        query = query.where(tuple_(Contact.last_name, Contact.first_name, Contact.id) > tuple_(*after))
+    query = query.order_by(Contact.last_name, Contact.first_name, Contact.id).offset(skip).limit(limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
 
-async def create_contact(db: AsyncSession, contact: ContactCreate):
-    db_contact = Contact(**contact.dict())
-    db.add(db_contact)
-    await db.commit()
-    await db.refresh(db_contact)
-    return db_contact
+async def get_contacts_by_ids(db: AsyncSession, user_email: str, contact_ids: Sequence[int]):
+    """
+    Завантажує контакти власника за списком id одним запитом.
+
+    На PostgreSQL список передається одним параметром-масивом (``id = ANY(:ids)``),
+    тож текст запиту не залежить від кількості id і підготовлений запит
+    перевикористовується; на інших СУБД використовується ``IN``.
+
+    :param db: Сесія бази даних
+    :param user_email: Email власника контактів
+    :param contact_ids: Id контактів
+    :return: Знайдені контакти в довільному порядку
+    """
+    if not contact_ids:
+        return []
+    id_filter = _in_list(db, Contact.id, "contact_ids", contact_ids, Integer)
+    result = await db.execute(select(Contact).where(Contact.user_email == user_email, id_filter))
+    return result.scalars().all()
+
+
+async def create_contact(db: AsyncSession, contact: ContactCreate, user_email: str):
+    return await db.scalar(insert(Contact).values(**contact.model_dump(), user_email=user_email).returning(Contact))
+
+
+async def create_contacts(db: AsyncSession, contacts: List[ContactCreate], user_email: str):
+    if not contacts:
+        return []
+    # Багаторядковий INSERT. Порядок рядків RETURNING не гарантовано, а id з
+    # послідовності не обов'язково зростають у порядку VALUES (кеш послідовності,
+    # одночасні вставки), тож SQLAlchemy сама зіставляє рядки з параметрами. На
+    # PostgreSQL це один INSERT ... SELECT ... ORDER BY; SQLite такого не підтримує,
+    # і там рядки вставляються по одному
+    result = await db.scalars(
+        insert(Contact).returning(Contact.id, sort_by_parameter_order=True),
+        [{**contact.model_dump(), "user_email": user_email} for contact in contacts],
+    )
+    return result.all()
+
+
+async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate, user_email: str):
+    values = contact.model_dump(exclude_unset=True)
+    if not values:
+        return await get_contact(db, contact_id, user_email)
+    return await db.scalar(
+        update(Contact)
+        .where(Contact.user_email == user_email, Contact.id == contact_id)
+        .values(**values)
+        .returning(Contact)
+    )
+
+
+async def delete_contact(db: AsyncSession, contact_id: int, user_email: str):
+    return await db.scalar(
+        delete(Contact).where(Contact.user_email == user_email, Contact.id == contact_id).returning(Contact)
+    )
+
+
+async def get_tags(db: AsyncSession, user_email: str):
+    """
+    Повертає мітки власника за назвою разом із кількістю контактів.
+
+    Кількість рахується одним ``GROUP BY`` за первинним ключем contact_tags.
+
+    :param db: Сесія бази даних
+    :param user_email: Email власника
+    :return: Пари ``(Tag, кількість контактів)``
+    """
+    counts = (
+        select(ContactTag.tag_id, func.count().label("contacts"))
+        .where(ContactTag.user_email == user_email)
+        .group_by(ContactTag.tag_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Tag, func.coalesce(counts.c.contacts, 0))
+        .outerjoin(counts, counts.c.tag_id == Tag.id)
+        .where(Tag.user_email == user_email)
+        .order_by(Tag.name)
+    )
+    return result.all()
+
+
+async def create_tag(db: AsyncSession, name: str, user_email: str):
+    return await db.scalar(insert(Tag).values(name=name, user_email=user_email).returning(Tag))
+
+
+async def delete_tag(db: AsyncSession, name: str, user_email: str):
+    # Належності контактів видаляє каскад зовнішнього ключа
+    return await db.scalar(delete(Tag).where(Tag.user_email == user_email, Tag.name == name).returning(Tag))
+
+
+async def assign_tags(db: AsyncSession, user_email: str, tags: Sequence[str], contact_ids: Sequence[int]) -> int:
+    """
+    Додає мітки контактам одним ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``.
+
+    ``SELECT`` будує добуток міток і контактів власника, тож чужі та неіснуючі
+    контакти і мітки відкидаються без окремих запитів, а вже наявні пари
+    пропускаються.
 
+    :param db: Сесія бази даних
+    :param user_email: Email власника
+    :param tags: Назви міток
+    :param contact_ids: Id контактів
+    :return: Кількість нових пар (мітка, контакт)
+    """
+    if not tags or not contact_ids:
+        return 0
+    pairs = (
+        select(literal(user_email, String), Tag.id, Contact.id)
+        .join(Contact, Contact.user_email == Tag.user_email)
+        .where(Tag.user_email == user_email, _in_list(db, Tag.name, "tag_names", tags, String),
+               Contact.user_email == user_email, _in_list(db, Contact.id, "contact_ids", contact_ids, Integer))
+    )
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    result = await db.execute(
+        dialect_insert(ContactTag)
+        .from_select([ContactTag.user_email, ContactTag.tag_id, ContactTag.contact_id], pairs)
+        .on_conflict_do_nothing()
+    )
+    return result.rowcount
 
-async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate):
-    db_contact = await get_contact(db, contact_id)
-    if db_contact:
-        for key, value in contact.dict(exclude_unset=True).items():
-            setattr(db_contact, key, value)
-        await db.commit()
-        await db.refresh(db_contact)
-    return db_contact
 
+async def unassign_tags(db: AsyncSession, user_email: str, tags: Sequence[str], contact_ids: Sequence[int]) -> int:
+    """
+    Знімає мітки з контактів одним ``DELETE``.
 
-async def delete_contact(db: AsyncSession, contact_id: int):
-    db_contact = await get_contact(db, contact_id)
-    if db_contact:
-        await db.delete(db_contact)
-        await db.commit()
-    return db_contact
+    :param db: Сесія бази даних
+    :param user_email: Email власника
+    :param tags: Назви міток
+    :param contact_ids: Id контактів
+    :return: Кількість видалених пар (мітка, контакт)
+    """
+    if not tags or not contact_ids:
+        return 0
+    tag_ids = select(Tag.id).where(Tag.user_email == user_email, _in_list(db, Tag.name, "tag_names", tags, String))
+    result = await db.execute(
+        delete(ContactTag).where(ContactTag.user_email == user_email, ContactTag.tag_id.in_(tag_ids),
+                                 _in_list(db, ContactTag.contact_id, "contact_ids", contact_ids, Integer))
+    )
+    return result.rowcount
@@ -1,10 +1,14 @@
-from fastapi_mail import FastMail, MessageSchema
-from cloudinary.uploader import upload
-from cloudinary.utils import cloudinary_url
+from datetime import date
+from html import escape
+from typing import List, Tuple
+
+from app.resources import configure_storage, get_mail
 
 
 # Функція для відправлення листа з верифікацією
 async def send_verification_email(email: str, token: str):
+    from fastapi_mail import MessageSchema
+
     verification_link = f"http://your-app-url.com/verify-email?token={token}"
 
     message = MessageSchema(
@@ -14,12 +18,16 @@ async def send_verification_email(email: str, token: str):
         subtype="html"
     )
 
-    fm = FastMail()  # Ініціалізуйте FastMail з вашими налаштуваннями
+    fm = get_mail()
     await fm.send_message(message)
 
 
 # Функція для завантаження аватара
 async def upload_avatar(file):
+    from cloudinary.uploader import upload
+    from cloudinary.utils import cloudinary_url
+
+    configure_storage()
     result = upload(file.file)
     avatar_url, options = cloudinary_url(result['public_id'], format="jpg")
     return avatar_url
@@ -27,6 +35,8 @@ async def upload_avatar(file):
 
 # Функція для відправлення листа з скиданням пароля
 async def send_reset_email(email: str, token: str):
+    from fastapi_mail import MessageSchema
+
     reset_link = f"http://your-app-url.com/reset-password?token={token}"
 
     message = MessageSchema(
@@ -36,5 +46,22 @@ async def send_reset_email(email: str, token: str):
         subtype="html"
     )
 
-    fm = FastMail()  # Ініціалізуйте FastMail з вашими налаштуваннями
+    fm = get_mail()
+    await fm.send_message(message)
+
+
+# Функція для відправлення щоденного дайджесту днів народження контактів
+async def send_birthday_digest(email: str, birthdays: List[Tuple[str, date]]):
+    from fastapi_mail import MessageSchema
+
+    items = "".join(f"<li>{escape(name)} — {day:%d.%m}</li>" for name, day in birthdays)
+
+    message = MessageSchema(
+        subject="Upcoming birthdays",
+        recipients=[email],
+        body=f"Upcoming birthdays of your contacts:<ul>{items}</ul>",
+        subtype="html"
+    )
+
+    fm = get_mail()
     await fm.send_message(message)
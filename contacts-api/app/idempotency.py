@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import json
+import secrets
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Відповіді зберігаються добу: цього досить для повторів з нестабільної мережі.
+RESPONSE_TTL_SECONDS = 24 * 60 * 60
+# Блокування на час виконання першого запиту; дублікати чекають на його результат.
+LOCK_TTL_MS = 30_000
+POLL_INTERVAL_SECONDS = 0.05
+
+
+def fingerprint(payload: Any) -> str:
+    """
+    Обчислює відбиток тіла запиту, щоб той самий ключ не використовувався з іншими даними.
+
+    :param payload: Дані запиту, що серіалізуються в JSON
+    :return: Шістнадцятковий SHA-256 відбиток
+    """
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def _load_response(redis, response_key: str, request_fingerprint: str) -> Optional[JSONResponse]:
+    raw = await redis.get(response_key)
+    if raw is None:
+        return None
+    stored = json.loads(raw)
+    if stored["f"] != request_fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_HEADER} was already used with a different request",
+        )
+    return JSONResponse(stored["b"], status_code=stored["s"], headers={REPLAYED_HEADER: "true"})
+
+
+async def idempotent(
+    redis,
+    scope: str,
+    key: Optional[str],
+    request_fingerprint: str,
+    handler: Callable[[], Awaitable[Any]],
+    status_code: int = status.HTTP_200_OK,
+    commit: Optional[Callable[[], Awaitable[None]]] = None,
+):
+    """
+    Виконує обробник запиту не більше одного разу для пари (scope, key).
+
+    Успішна відповідь зберігається в Redis на ``RESPONSE_TTL_SECONDS`` і
+    повертається на повторні запити без виклику обробника. Одночасні дублікати
+    чекають, доки перший запит, що тримає блокування, збереже відповідь.
+    Помилки не зберігаються: після них блокування знімається і запит можна повторити.
+
+    Якщо обробник пише в базу, передайте ``commit``: відповідь зберігається лише
+    після фіксації транзакції. Інакше помилка під час ``COMMIT`` у ``get_db``
+    (конфлікт серіалізації, взаємне блокування, ``statement_timeout``) дала б
+    клієнту 5xx, а повтори з тим самим ключем — успішну відповідь для рядків,
+    яких у базі немає.
+
+    :param redis: Асинхронний клієнт Redis
+    :param scope: Власник ключа, наприклад email користувача
+    :param key: Значення заголовка ``Idempotency-Key`` або ``None``
+    :param request_fingerprint: Відбиток тіла запиту, див. ``fingerprint``
+    :param handler: Корутина, що виконує запит і повертає тіло відповіді
+    :param status_code: Код успішної відповіді
+    :param commit: Корутина, що фіксує транзакцію запиту, наприклад ``db.commit``;
+        виконується під блокуванням, до збереження відповіді
+    :return: Тіло відповіді або ``JSONResponse`` з результатом першого запиту
+    :raises HTTPException: 422, якщо ключ уже використано з іншими даними;
+        409, якщо перший запит не завершився за ``LOCK_TTL_MS``
+    """
+    if not key:
+        # Без ключа транзакцію фіксує get_db після обробника
+        return await handler()
+
+    response_key = f"idempotency:{scope}:{key}"
+    lock_key = f"{response_key}:lock"
+    deadline = asyncio.get_running_loop().time() + LOCK_TTL_MS / 1000
+
+    while True:
+        replay = await _load_response(redis, response_key, request_fingerprint)
+        if replay is not None:
+            return replay
+
+        lock_token = secrets.token_hex(8)
+        if await redis.set(lock_key, lock_token, nx=True, px=LOCK_TTL_MS):
+            try:
+                body = jsonable_encoder(await handler())
+                if commit is not None:
+                    await commit()
+                stored = {"f": request_fingerprint, "s": status_code, "b": body}
+                await redis.set(response_key, json.dumps(stored), ex=RESPONSE_TTL_SECONDS)
+                return JSONResponse(body, status_code=status_code)
+            finally:
+                current = await redis.get(lock_key)
+                if current in (lock_token, lock_token.encode()):
+                    await redis.delete(lock_key)
+
+        if asyncio.get_running_loop().time() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress",
+            )
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
@@ -0,0 +1,79 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.models import Contact
+
+
+class ContactLoader:
+    """
+    Пакетне завантаження контактів у межах одного запиту (у стилі DataLoader).
+
+    Id, запитані через ``load`` протягом одного проходу циклу подій, збираються
+    і завантажуються одним запитом ``crud.get_contacts_by_ids``. Результати
+    кешуються до кінця запиту, тому повторне звернення за тим самим id не
+    потребує нового запиту до бази даних.
+    """
+
+    def __init__(self, db: AsyncSession, user_email: str, batch_load=crud.get_contacts_by_ids):
+        self.db = db
+        self.user_email = user_email
+        self.batch_load = batch_load
+        self._results: Dict[int, asyncio.Future] = {}
+        self._queue: List[int] = []
+        self._batches: set = set()
+        # AsyncSession не допускає одночасних запитів, тому пакети виконуються по черзі
+        self._lock = asyncio.Lock()
+
+    def load(self, contact_id: int) -> "asyncio.Future[Optional[Contact]]":
+        """
+        Планує завантаження контакту.
+
+        :param contact_id: Id контакту
+        :return: Future з контактом або ``None``, якщо контакт не знайдено
+        """
+        future = self._results.get(contact_id)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._results[contact_id] = future
+        if not self._queue:
+            loop.call_soon(self._dispatch)
+        self._queue.append(contact_id)
+        return future
+
+    async def load_many(self, contact_ids: List[int]) -> List[Optional[Contact]]:
+        """
+        Завантажує кілька контактів, зберігаючи порядок ``contact_ids``.
+
+        :param contact_ids: Id контактів
+        :return: Контакти або ``None`` для відсутніх id
+        """
+        return list(await asyncio.gather(*(self.load(contact_id) for contact_id in contact_ids)))
+
+    def _dispatch(self) -> None:
+        contact_ids, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._load_batch(contact_ids))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _load_batch(self, contact_ids: List[int]) -> None:
+        try:
+            async with self._lock:
+                contacts = await self.batch_load(self.db, self.user_email, contact_ids)
+        except Exception as error:
+            for contact_id in contact_ids:
+                future = self._results.pop(contact_id)
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        by_id = {contact.id: contact for contact in contacts}
+        for contact_id in contact_ids:
+            future = self._results[contact_id]
+            if not future.done():
+                future.set_result(by_id.get(contact_id))
@@ -0,0 +1,213 @@
+"""
+Структуровані JSON-логи без блокування циклу подій.
+
+* ``setup_logging`` підключає до кореневого логера ``QueueHandler``: у потоці
+  циклу подій запис лише фільтрується і кладеться в чергу, а форматування JSON
+  і запис у потік виконує ``QueueListener`` в окремому потоці.
+* ``RequestIdMiddleware`` бере ``X-Request-ID`` клієнта або генерує новий,
+  зберігає його в ``request_id`` (contextvar) і повертає у відповіді.
+  ``RequestIdFilter`` на черговому обробнику додає id до кожного запису,
+  зокрема до SQL (``sqlalchemy.engine``) і кешу (``app.cache``), бо
+  contextvar доступний у коді, що виконується в межах запиту.
+* ``SamplingFilter`` пропускає лише частку записів DEBUG та INFO галасливих
+  логерів. Рішення приймається один раз на запит за випадковим числом, яке
+  ``RequestIdMiddleware`` кладе в ``sample_draw``, тож вибраний запит логується
+  повністю, а решта — зовсім ні. Id клієнта на вибірку не впливає: інакше
+  клієнт міг би підібрати id, що логується завжди.
+
+Модуль названо ``log``, а не ``logging``, щоб не затінювати стандартну бібліотеку.
+"""
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, Optional
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Випадкове число з [0, 1), спільне для всіх записів запиту
+sample_draw: ContextVar[Optional[float]] = ContextVar("sample_draw", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Логери, що пишуть INFO на кожен запит або SQL-запит
+SAMPLED_LOGGERS = ("sqlalchemy.engine", "app.cache")
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Атрибути, які має кожен LogRecord; решта — поля, передані через ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+access_logger = logging.getLogger("app.access")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматує запис як один рядок JSON з полями, переданими через ``extra``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Додає до запису id поточного запиту.
+
+    Має стояти на ``QueueHandler``, а не на обробнику слухача: contextvar
+    читається в тому потоці й контексті, де запис створено.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускає частку ``rate`` записів DEBUG і записів INFO логерів ``loggers``.
+
+    У запиті рішення однакове для всіх записів і залежить від ``sample_draw``;
+    поза запитом — випадкове для кожного запису. Записи WARNING і вище не відкидаються ніколи.
+
+    :param rate: Частка від 0 до 1
+    :param loggers: Логери, записи INFO яких теж вибіркові
+    """
+
+    def __init__(self, rate: float, loggers: Iterable[str] = SAMPLED_LOGGERS):
+        super().__init__()
+        self.rate = rate
+        self.loggers = tuple(loggers)
+
+    def _sampled(self) -> bool:
+        draw = sample_draw.get()
+        if draw is None:
+            draw = random.random()
+        return draw < self.rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.rate >= 1:
+            return True
+        if record.levelno > logging.DEBUG and not record.name.startswith(self.loggers):
+            return True
+        return self._sampled()
+
+
+class _AppQueueHandler(QueueHandler):
+    # Окремий клас, щоб повторний setup_logging замінив саме цей обробник
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Черга в тому самому процесі: запис не серіалізується, тож копія і видалення
+        # traceback, як у QueueHandler, не потрібні. Аргументи підставляються одразу,
+        # бо до запису в потоці слухача об'єкти можуть змінитися
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: str = "INFO", sample_rate: float = 1.0, stream=None) -> QueueListener:
+    """
+    Підключає до кореневого логера чергу з JSON-виводом в окремому потоці.
+
+    Повторний виклик замінює обробник, підключений попереднім викликом; інші
+    обробники кореневого логера не змінюються.
+
+    :param level: Рівень кореневого логера в будь-якому регістрі: ``LOG_LEVEL``
+        спільний з uvicorn, який очікує малі літери
+    :param sample_rate: Частка вибіркових записів, див. ``SamplingFilter``
+    :param stream: Куди писати; за замовчуванням ``sys.stderr``
+    :return: Запущений ``QueueListener``; зупиняється ``stop_logging``
+    """
+    root = logging.getLogger()
+    for handler in [handler for handler in root.handlers if isinstance(handler, _AppQueueHandler)]:
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    handler = _AppQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(sample_rate))
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    listener.app_handler = handler
+    return listener
+
+
+def stop_logging(listener: QueueListener) -> None:
+    """
+    Від'єднує обробник від кореневого логера і дописує записи, що лишилися в черзі.
+
+    :param listener: Результат ``setup_logging``
+    """
+    logging.getLogger().removeHandler(listener.app_handler)
+    listener.stop()
+
+
+class RequestIdMiddleware:
+    """
+    ASGI-middleware, що присвоює запиту id і записує один рядок журналу доступу.
+
+    Id клієнта з ``X-Request-ID`` приймається, якщо він короткий і містить лише
+    безпечні символи; інакше генерується новий.
+
+    :param app: Наступний ASGI-застосунок
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode()
+        incoming = next((value.decode("latin-1") for name, value in scope["headers"] if name == header), "")
+        current = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        token = request_id.set(current)
+        draw_token = sample_draw.set(random.random())
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (header, current.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if access_logger.isEnabledFor(logging.INFO):
+                access_logger.info("%s %s %d", scope["method"], scope["path"], status, extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                })
+            sample_draw.reset(draw_token)
+            request_id.reset(token)
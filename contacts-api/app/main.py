@@ -1,171 +1,390 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    FastAPI,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from pydantic import EmailStr
-from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
+from sqlalchemy.exc import DBAPIError, IntegrityError, TimeoutError as PoolTimeoutError
 from sqlalchemy.future import select
-from passlib.context import CryptContext
-from redis import asyncio as aioredis
-from slowapi import Limiter
+from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
-import jwt
 import datetime
-import os
-from models import Base, User, Contact
-from schemas import UserCreate, ContactCreate
-from database import get_db
-from dependencies import send_verification_email, upload_avatar, send_reset_email
+from app.auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    create_access_token,
+    hash_password,
+    verify_password,
+    verify_token,
+)
+from app import crud
+from app.admission import AdmissionControl, database_overload_handler
+from app.cache import CoalescingCache
+from app.config import Settings, configure_settings, get_settings
+from app.models import User
+from app.schemas import Contact as ContactSchema, ContactBatch, ContactCreate, Tag as TagSchema, TagAssignment, TagCreate, TokenRefresh, UserCreate
+from app.database import dispose_engine, get_db, get_sessionmaker
+from app.dependencies import send_verification_email, upload_avatar, send_reset_email
+from app.loaders import ContactLoader
+from app.log import RequestIdMiddleware, setup_logging, stop_logging
+from app.pagination import Cursor, decode_cursor, encode_cursor
+from app.idempotency import IDEMPOTENCY_HEADER, fingerprint, idempotent
+from app.refresh_tokens import issue_refresh_token, rotate_refresh_token
+from app.resources import close_resources, get_redis
 
 
+# OAuth2 Scheme
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+router = APIRouter()
 
-# Налаштування конфігурації
-SECRET_KEY = os.getenv("SECRET_KEY", "9smP3~7sMg4kCVfUFc&2!t7;3(LU4")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-# Ініціалізація FastAPI
-app = FastAPI()
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Створює застосунок FastAPI.
 
-# OAuth2 Scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+    Під час створення не відкривається жодне підключення: Redis, база даних,
+    пошта та сховище файлів ініціалізуються ліниво і закриваються в ``lifespan``.
 
-# Хешування паролів
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    :param settings: Налаштування застосунку; якщо не задано, читаються з оточення
+    :return: Налаштований застосунок
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if settings is not None:
+            configure_settings(settings)
+        app_settings = get_settings()
+        # Логи пишуться з окремого потоку; до lifespan і після нього — стандартними обробниками
+        log_listener = setup_logging(app_settings.log_level, app_settings.log_sample_rate)
+        # Rate Limiting: лічильники зберігаються в Redis і спільні для всіх воркерів
+        app.state.limiter = Limiter(
+            key_func=get_remote_address,
+            storage_uri=app_settings.rate_limit_storage_uri or app_settings.redis_url,
+        )
+        # Підключення до Redis для кешування
+        from fastapi_cache import FastAPICache
+        from fastapi_cache.backends.redis import RedisBackend
+
+        FastAPICache.init(RedisBackend(get_redis()), prefix="fastapi-cache")
+        app.state.cache = CoalescingCache(
+            FastAPICache.get_backend(),
+            prefix=f"{FastAPICache.get_prefix()}:contacts",
+            ttl=app_settings.cache_ttl,
+            stale_ttl=app_settings.cache_stale_ttl,
+        )
+        try:
+            yield
+        finally:
+            FastAPICache.reset()
+            await close_resources()
+            await dispose_engine()
+            stop_logging(log_listener)
+
+    app = FastAPI(lifespan=lifespan)
+
+    # Middleware, додане пізніше, виконується раніше (зовнішній шар)
+
+    # Rate Limiting; сам ``Limiter`` створюється в ``lifespan`` кожного воркера
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    app.add_middleware(SlowAPIMiddleware)
+
+    # Контроль допуску — ззовні rate limit: відхилений запит не звертається навіть до його лічильників
+    app.add_middleware(AdmissionControl)
+    app.add_exception_handler(PoolTimeoutError, database_overload_handler)
+    app.add_exception_handler(DBAPIError, database_overload_handler)
+
+    # CORS — ззовні контролю допуску: відповіді 503 теж мають заголовки CORS, тож
+    # браузер бачить повторюваний 503, а не непрозору помилку; preflight-запити
+    # OPTIONS обробляються тут і не займають місць класу reads
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Id запиту присвоюється першим, тож його мають і записи про відхилені запити
+    app.add_middleware(RequestIdMiddleware)
+
+    app.include_router(router)
+    return app
 
-# CORS Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Rate Limiting
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, limiter._rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
-
-# Підключення до Redis для кешування
-@app.on_event("startup")
-async def startup():
-    redis = aioredis.from_url("redis://localhost")
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
-
-# Функції для створення токенів
-def create_access_token(data: dict, expires_delta: datetime.timedelta = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def create_refresh_token(data: dict):
-    expire = datetime.datetime.utcnow() + datetime.timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = data.copy()
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def verify_token(token: str):
+# Перевірка готовності воркера для балансувальника
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+async def get_current_email(token: str = Depends(oauth2_scheme)) -> str:
+    """
+    Повертає email користувача з токену доступу без звернення до бази даних.
+    """
+    payload = verify_token(token)
+    if not payload or "sub" not in payload or payload.get("typ") == "refresh":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload["sub"]
+
+
+def get_cache(request: Request) -> CoalescingCache:
+    return request.app.state.cache
+
+
+def get_contact_loader(db: AsyncSession = Depends(get_db), user_email: str = Depends(get_current_email)) -> ContactLoader:
+    return ContactLoader(db, user_email)
+
+
+# Найбільше id у пакетному запиті, як і ``limit`` списку: обмежує розмір запиту і
+# кількість параметрів SQL (на SQLite ``IN`` з десятками тисяч значень не виконується)
+MAX_IDS = 1000
+
+
+def parse_ids(ids: str = Query(..., description="Comma-separated contact ids")) -> List[int]:
+    values = [value for value in ids.split(",") if value.strip()]
+    if len(values) > MAX_IDS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At most {MAX_IDS} ids are allowed")
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.PyJWTError:
+        return list(dict.fromkeys(int(value) for value in values))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="ids must be integers")
+
+
+def parse_tags(tags: Optional[str] = Query(None, description="Comma-separated tag names")) -> Optional[List[str]]:
+    if tags is None:
         return None
+    return list(dict.fromkeys(name.strip() for name in tags.split(",") if name.strip()))
+
+
+def parse_cursor(cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page")) -> Optional[Cursor]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor")
+
 
 # Реєстрація користувача
-@app.post("/register")
-async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    async with db.begin():
-        existing_user = await db.execute(select(User).filter(User.email == user.email))
-        if existing_user.scalars().first():
+@router.post("/register")
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db), redis=Depends(get_redis),
+                   idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)):
+    async def handle():
+        # bcrypt займає процесор на сотні мілісекунд: у пулі потоків він не зупиняє цикл подій
+        hashed_password = await run_in_threadpool(hash_password, user.password)
+        db.add(User(email=user.email, hashed_password=hashed_password))
+        # Унікальність email перевіряє сама база: один INSERT замість SELECT і INSERT
+        try:
+            await db.flush()
+        except IntegrityError:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
 
-        hashed_password = pwd_context.hash(user.password)
-        new_user = User(email=user.email, hashed_password=hashed_password)
-        db.add(new_user)
-        await db.commit()
-
-        # Відправка електронного листа для верифікації
-        token = create_access_token({"sub": new_user.email})
-        await send_verification_email(EmailStr(email=new_user.email), token)
+        # Відправка електронного листа для верифікації; якщо вона не вдалася, транзакція відкочується
+        token = create_access_token({"sub": user.email})
+        await send_verification_email(user.email, token)
 
         return {"msg": "User created. Please verify your email."}
 
+    # Пароль не входить у відбиток, щоб не зберігати похідні від нього дані в Redis
+    return await idempotent(redis, f"register:{user.email}", idempotency_key,
+                            fingerprint({"email": user.email}), handle, commit=db.commit)
+
+
 # Авторизація користувача з кешуванням у Redis
-@app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    async with db.begin():
-        user = await db.execute(select(User).filter(User.email == form_data.username))
-        user = user.scalars().first()
-        if not user or not pwd_context.verify(form_data.password, user.hashed_password):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+@router.post("/token")
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db),
+                redis=Depends(get_redis)):
+    user = await db.execute(select(User).filter(User.email == form_data.username))
+    user = user.scalars().first()
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+
+    access_token_expires = datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    refresh_token = await issue_refresh_token(redis, user.email)
 
-        access_token_expires = datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
-        refresh_token = create_refresh_token(data={"sub": user.email})
+    # Кешування поточного користувача в Redis
+    await redis.set(f"user:{user.email}", user.email, ex=60 * 60)  # зберігається на 1 годину
 
-        # Кешування поточного користувача в Redis
-        redis_client = FastAPICache.get_backend().redis
-        await redis_client.set(f"user:{user.email}", user.email, ex=60 * 60)  # зберігається на 1 годину
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
-        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+# Оновлення токена доступу без пароля і бази даних; refresh-токен замінюється новим
+@router.post("/token/refresh")
+async def refresh_token(body: TokenRefresh, redis=Depends(get_redis)):
+    email, new_refresh_token = await rotate_refresh_token(redis, body.refresh_token)
+    access_token_expires = datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(data={"sub": email}, expires_delta=access_token_expires)
+    return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
 
 
 # Запит на скидання паролю
-@app.post("/password/reset/request")
+@router.post("/password/reset/request")
 async def request_password_reset(email: EmailStr, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
-    async with db.begin():
-        user = await db.execute(select(User).filter(User.email == email))
-        user = user.scalars().first()
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user = await db.execute(select(User).filter(User.email == email))
+    user = user.scalars().first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        # Генерація токену для скидання паролю
-        reset_token = create_access_token(data={"sub": user.email})
-        background_tasks.add_task(send_reset_email, email, reset_token)
-        return {"msg": "Password reset email sent"}
+    # Генерація токену для скидання паролю
+    reset_token = create_access_token(data={"sub": user.email}, expires_delta=datetime.timedelta(minutes=15))
+    background_tasks.add_task(send_reset_email, email, reset_token)
+    return {"msg": "Password reset email sent"}
 
 # Скидання паролю
-@app.post("/reset-password")
+@router.post("/reset-password")
 async def reset_password(email: EmailStr, db: AsyncSession = Depends(get_db)):
-    async with db.begin():
-        user = await db.execute(select(User).filter(User.email == email))
-        user = user.scalars().first()
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user = await db.execute(select(User).filter(User.email == email))
+    user = user.scalars().first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        # Генерація токену для скидання паролю
-        reset_token = create_access_token(data={"sub": user.email}, expires_delta=datetime.timedelta(minutes=15))
+    # Генерація токену для скидання паролю
+    reset_token = create_access_token(data={"sub": user.email}, expires_delta=datetime.timedelta(minutes=15))
 
-        # Відправка листа зі скиданням паролю
-        await send_verification_email(email, reset_token)
+    # Відправка листа зі скиданням паролю
+    await send_verification_email(email, reset_token)
 
-        return {"msg": "Password reset link sent to your email."}
+    return {"msg": "Password reset link sent to your email."}
 
 
 # Оновлення аватара користувача
-@app.post("/users/me/avatar")
-async def update_avatar(file: UploadFile, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
+@router.post("/users/me/avatar")
+async def update_avatar(file: UploadFile, db: AsyncSession = Depends(get_db),
+                        user_email: str = Depends(get_current_email)):
+    # Підключення до бази береться лише після завантаження файлу
     avatar_url = await upload_avatar(file)
-    async with db.begin():
-        user = await db.execute(select(User).filter(User.email == payload["sub"]))
-        user = user.scalars().first()
-        user.avatar_url = avatar_url
-        db.commit()
-        return {"avatar_url": avatar_url}
+    user_id = await db.scalar(
+        update(User).where(User.email == user_email).values(avatar_url=avatar_url).returning(User.id)
+    )
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return {"avatar_url": avatar_url}
+
+
+# Створення контакту
+@router.post("/contacts", status_code=status.HTTP_201_CREATED)
+async def create_contact(contact: ContactCreate, db: AsyncSession = Depends(get_db), redis=Depends(get_redis),
+                         user_email: str = Depends(get_current_email),
+                         idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)):
+    async def handle():
+        db_contact = await crud.create_contact(db, contact, user_email)
+        return ContactSchema.model_validate(db_contact)
+
+    return await idempotent(redis, user_email, idempotency_key, fingerprint(["contacts", contact]), handle,
+                            status_code=status.HTTP_201_CREATED, commit=db.commit)
+
+
+# Масовий імпорт контактів
+@router.post("/contacts/import", status_code=status.HTTP_201_CREATED)
+async def import_contacts(contacts: List[ContactCreate], db: AsyncSession = Depends(get_db), redis=Depends(get_redis),
+                          user_email: str = Depends(get_current_email),
+                          idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)):
+    async def handle():
+        contact_ids = await crud.create_contacts(db, contacts, user_email)
+        return {"imported": len(contact_ids), "ids": contact_ids}
+
+    return await idempotent(redis, user_email, idempotency_key, fingerprint(["contacts/import", contacts]), handle,
+                            status_code=status.HTTP_201_CREATED, commit=db.commit)
+
+
+# Мітки (групи) контактів
+@router.get("/tags")
+async def read_tags(db: AsyncSession = Depends(get_db), user_email: str = Depends(get_current_email)):
+    tags = await crud.get_tags(db, user_email)
+    return [TagSchema(id=tag.id, name=tag.name, contacts=contacts) for tag, contacts in tags]
+
+
+@router.post("/tags", status_code=status.HTTP_201_CREATED)
+async def create_tag(tag: TagCreate, db: AsyncSession = Depends(get_db), user_email: str = Depends(get_current_email)):
+    # Унікальність назви в межах власника перевіряє сама база
+    try:
+        db_tag = await crud.create_tag(db, tag.name, user_email)
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tag already exists")
+    return TagSchema.model_validate(db_tag)
+
+
+@router.delete("/tags/{name}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_tag(name: str, db: AsyncSession = Depends(get_db), user_email: str = Depends(get_current_email)):
+    if await crud.delete_tag(db, name, user_email) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+
+
+# Масове додавання і зняття міток: кожне — одна інструкція SQL
+@router.post("/contacts/tags")
+async def assign_tags(assignment: TagAssignment, db: AsyncSession = Depends(get_db),
+                      user_email: str = Depends(get_current_email)):
+    assigned = await crud.assign_tags(db, user_email, assignment.tags, assignment.contact_ids)
+    return {"assigned": assigned}
+
+
+@router.delete("/contacts/tags")
+async def unassign_tags(assignment: TagAssignment, db: AsyncSession = Depends(get_db),
+                        user_email: str = Depends(get_current_email)):
+    removed = await crud.unassign_tags(db, user_email, assignment.tags, assignment.contact_ids)
+    return {"removed": removed}
+
+
+# Список контактів, упорядкований за прізвищем та іменем; наступна сторінка: ?cursor=<X-Next-Cursor>.
+# Фільтр за мітками: ?tags=work,family (хоча б одна) або ще &match=all (усі)
+@router.get("/contacts", response_model=List[ContactSchema])
+async def read_contacts(response: Response, skip: int = 0, limit: int = Query(10, ge=1, le=1000),
+                        tags: Optional[List[str]] = Depends(parse_tags),
+                        match: str = Query("any", pattern="^(any|all)$"), cursor: Optional[Cursor] = Depends(parse_cursor),
+                        db: AsyncSession = Depends(get_db), user_email: str = Depends(get_current_email)):
+    contacts = await crud.get_contacts(db, user_email, skip, limit, tags=tags, match_all=match == "all", after=cursor)
+    if len(contacts) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(contacts[-1])
+    return [ContactSchema.model_validate(contact) for contact in contacts]
+
+
+# Пакетне отримання за id: GET /contacts/batch?ids=3,1,2; оголошено до /contacts/{contact_id}
+@router.get("/contacts/batch", response_model=ContactBatch)
+async def read_contacts_batch(ids: List[int] = Depends(parse_ids), loader: ContactLoader = Depends(get_contact_loader)):
+    contacts = await loader.load_many(ids)
+    return ContactBatch(
+        contacts=[ContactSchema.model_validate(contact) for contact in contacts if contact is not None],
+        missing=[contact_id for contact_id, contact in zip(ids, contacts) if contact is None],
+    )
+
+
+# Отримання контакту з кешу; одночасні промахи виконують один запит до бази
+@router.get("/contacts/{contact_id}")
+async def read_contact(contact_id: int, session_factory=Depends(get_sessionmaker),
+                       cache: CoalescingCache = Depends(get_cache), user_email: str = Depends(get_current_email)):
+    # Завантажувач відкриває власну сесію: він може виконатися у фоні вже після відповіді
+    async def load():
+        async with session_factory() as db:
+            db_contact = await crud.get_contact(db, contact_id, user_email)
+            if db_contact is None:
+                return None
+            return ContactSchema.model_validate(db_contact)
+
+    contact = await cache.get_or_load(f"{user_email}:{contact_id}", load)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    return contact
+
+
+# Ініціалізація FastAPI
+app = create_app()
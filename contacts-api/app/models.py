@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import (
+    Column,
+    Date,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel
@@ -19,17 +29,105 @@ class User(Base):
 
 class Contact(Base):
     __tablename__ = "contacts"
+    # На PostgreSQL таблицю можна секціонувати хешем від власника (app/partitioning.py)
+    __table_args__ = (
+        # Список контактів власника, упорядкований за іменем
+        Index("ix_contacts_owner_name", "user_email", "last_name", "first_name", "id"),
+        # Ціль складеного зовнішнього ключа з contact_tags; у секціонованій таблиці збігається з первинним ключем
+        Index("ix_contacts_id_owner", "id", "user_email", unique=True),
+        {"info": {"partition_key": "user_email"}},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
+    # NOT NULL: ім'я та прізвище входять у ключ сортування і курсор списку (app/pagination.py)
+    first_name = Column(String, nullable=False, index=True)
+    last_name = Column(String, nullable=False, index=True)
     email = Column(String, index=True)
     phone = Column(String)
     birthday = Column(Date)
     additional_data = Column(String, nullable=True)
-    user_email = Column(String, index=True)
+    user_email = Column(String, ForeignKey("users.email"), nullable=False, index=True)
     owner = relationship("User", back_populates="contacts")
 
+    # Ключ секціонування входить в ідентичність об'єкта, тож UPDATE, DELETE і
+    # refresh, які генерує ORM, теж фільтрують за власником
+    __mapper_args__ = {"primary_key": [id, user_email]}
+
+
+class Tag(Base):
+    """
+    Мітка (група) контактів власника; назва унікальна в межах власника.
+    """
+    __tablename__ = "tags"
+    __table_args__ = (UniqueConstraint("user_email", "name", name="uq_tags_owner_name"),)
+
+    id = Column(Integer, primary_key=True)
+    user_email = Column(String, ForeignKey("users.email"), nullable=False)
+    name = Column(String, nullable=False)
+
+
+class ContactTag(Base):
+    """
+    Належність контакту до мітки.
+
+    Рядок містить власника, тож обидва індекси починаються з ``user_email``:
+    первинний ключ ``(user_email, tag_id, contact_id)`` відповідає на «контакти
+    з міткою», ``ix_contact_tags_owner_contact`` — на «мітки контакту» і
+    перевірку належності під час обходу контактів за іменем. Складений
+    зовнішній ключ ``(contact_id, user_email)`` не дозволяє позначити чужий
+    контакт і працює з секціонованою таблицею contacts.
+    """
+    __tablename__ = "contact_tags"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_email", "tag_id", "contact_id"),
+        ForeignKeyConstraint(["contact_id", "user_email"], ["contacts.id", "contacts.user_email"],
+                             ondelete="CASCADE"),
+        Index("ix_contact_tags_owner_contact", "user_email", "contact_id", "tag_id"),
+    )
+
+    user_email = Column(String, nullable=False)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False)
+    contact_id = Column(Integer, nullable=False)
+
+
+class ReminderCheckpoint(Base):
+    """
+    Останній день, за який планувальник нагадувань завершив розсилку.
+    """
+    __tablename__ = "reminder_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_date = Column(Date, nullable=False)
+
+
+class ReminderDelivery(Base):
+    """
+    Власник уже отримав нагадування про дні народження, що припадають на ``occurs_on``.
+
+    Дозволяє після перезапуску посеред вікна не надсилати лист повторно.
+    """
+    __tablename__ = "reminder_deliveries"
+    __table_args__ = (PrimaryKeyConstraint("occurs_on", "user_email"),)
+
+    occurs_on = Column(Date, nullable=False)
+    user_email = Column(String, nullable=False)
+
+
+class ReminderFailure(Base):
+    """
+    Невдалі спроби надіслати власнику нагадування про дні народження, що припадають на ``occurs_on``.
+
+    Запис лишається після переходу контрольної точки: наступні запуски
+    повторюють відправлення, доки ``attempts`` не досягне межі планувальника.
+    Далі запис лишається як недоставлений (dead letter) і більше не повторюється.
+    """
+    __tablename__ = "reminder_failures"
+    __table_args__ = (PrimaryKeyConstraint("occurs_on", "user_email"),)
+
+    occurs_on = Column(Date, nullable=False)
+    user_email = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False)
+
 
 class UserCreate(BaseModel):
     email: str
@@ -0,0 +1,42 @@
+"""
+Курсори для посторінкового обходу контактів за іменем (keyset pagination).
+
+Курсор — ключ сортування ``(last_name, first_name, id)`` останнього контакту
+сторінки, закодований у base64url. Наступна сторінка вибирається умовою
+``(last_name, first_name, id) > курсор`` за індексом ``ix_contacts_owner_name``,
+тож її вартість не залежить від глибини, на відміну від ``OFFSET``. Ім'я та
+прізвище — ``NOT NULL``: порівняння кортежів пропускало б рядки з ``NULL``.
+"""
+import base64
+import json
+from typing import Tuple
+
+Cursor = Tuple[str, str, int]
+
+
+def encode_cursor(contact) -> str:
+    """
+    Кодує позицію після контакту.
+
+    :param contact: Останній контакт сторінки
+    :return: Непрозорий рядок курсора
+    """
+    key = json.dumps([contact.last_name, contact.first_name, contact.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Розбирає курсор, отриманий від ``encode_cursor``.
+
+    :param cursor: Рядок курсора
+    :return: Ключ сортування ``(last_name, first_name, id)``
+    :raises ValueError: Якщо курсор пошкоджений
+    """
+    try:
+        last_name, first_name, contact_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not (isinstance(last_name, str) and isinstance(first_name, str) and isinstance(contact_id, int)):
+        raise ValueError("Invalid cursor")
+    return last_name, first_name, contact_id
@@ -0,0 +1,124 @@
+"""
+Хеш-секціонування таблиці ``contacts`` за власником на PostgreSQL.
+
+ORM-модель ``Contact`` однакова для обох варіантів таблиці: ідентичність об'єкта
+в маппері — ``(id, user_email)``, а всі функції ``crud`` фільтрують за ключем
+секціонування ``user_email``, тож PostgreSQL відкидає секції інших власників ще
+на етапі планування запиту. Секціонована таблиця відрізняється лише DDL:
+первинний ключ має містити ключ секціонування — ``(id, user_email)``, а ``id``
+береться зі спільної послідовності, тому лишається унікальним у всій таблиці.
+
+На інших СУБД (SQLite у тестах) та при ``partitions == 0`` схема створюється
+звичайним ``Base.metadata.create_all``.
+"""
+from typing import List
+
+from sqlalchemy import Column, ForeignKey, Index, MetaData, PrimaryKeyConstraint, Table, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.models import Base, Contact
+
+
+def partition_key(table: Table) -> str:
+    return table.info["partition_key"]
+
+
+def id_sequence(table: Table) -> str:
+    return f"{table.name}_id_seq"
+
+
+def _partitioned_table(table: Table, metadata: MetaData) -> Table:
+    key = partition_key(table)
+    columns = []
+    for column in table.columns:
+        server_default = column.server_default
+        if column.primary_key:
+            server_default = text(f"nextval('{id_sequence(table)}')")
+        columns.append(Column(
+            column.name,
+            column.type,
+            *[ForeignKey(foreign_key.target_fullname) for foreign_key in column.foreign_keys],
+            nullable=column.nullable if not column.primary_key else False,
+            server_default=server_default,
+            autoincrement=False,
+        ))
+    pk_columns = [column.name for column in table.primary_key.columns] + [key]
+    partitioned = Table(
+        table.name,
+        metadata,
+        *columns,
+        PrimaryKeyConstraint(*pk_columns),
+        postgresql_partition_by=f"HASH ({key})",
+    )
+    for index in table.indexes:
+        Index(index.name, *[partitioned.c[column.name] for column in index.columns], unique=index.unique)
+    return partitioned
+
+
+def partitioned_table_ddl(table: Table, partitions: int) -> List[str]:
+    """
+    Формує DDL для таблиці, секціонованої хешем від ключа ``table.info["partition_key"]``.
+
+    Міграції передають сюди власний знімок таблиці, щоб ревізія не залежала від
+    поточного стану моделей.
+
+    :param table: Опис таблиці з єдиною колонкою первинного ключа
+    :param partitions: Кількість хеш-секцій
+    :return: Список SQL-інструкцій для PostgreSQL
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be positive")
+    metadata = MetaData()
+    # Таблиці, на які посилаються зовнішні ключі, мають бути в тих самих метаданих
+    for referred in {foreign_key.column.table for foreign_key in table.foreign_keys}:
+        referred.to_metadata(metadata)
+    partitioned = _partitioned_table(table, metadata)
+    dialect = postgresql.dialect()
+    sequence = id_sequence(table)
+    pk_column = next(iter(table.primary_key.columns)).name
+
+    statements = [f"CREATE SEQUENCE IF NOT EXISTS {sequence}"]
+    statements.append(str(CreateTable(partitioned).compile(dialect=dialect)).strip())
+    statements.append(f"ALTER SEQUENCE {sequence} OWNED BY {table.name}.{pk_column}")
+    for remainder in range(partitions):
+        statements.append(
+            f"CREATE TABLE {table.name}_p{remainder} PARTITION OF {table.name} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+    for index in sorted(partitioned.indexes, key=lambda index: index.name):
+        statements.append(str(CreateIndex(index).compile(dialect=dialect)).strip())
+    return statements
+
+
+def partitioned_contacts_ddl(partitions: int) -> List[str]:
+    """
+    Формує DDL для секціонованої таблиці ``contacts`` за поточною моделлю.
+
+    :param partitions: Кількість хеш-секцій
+    :return: Список SQL-інструкцій для PostgreSQL
+    """
+    return partitioned_table_ddl(Contact.__table__, partitions)
+
+
+def create_schema(connection, partitions: int = 0) -> None:
+    """
+    Створює всі таблиці; на PostgreSQL з ``partitions > 0`` — із секціонованою ``contacts``.
+
+    Викликається через ``AsyncConnection.run_sync``.
+
+    :param connection: Синхронне підключення SQLAlchemy
+    :param partitions: Кількість хеш-секцій таблиці ``contacts``
+    """
+    contacts = Contact.__table__
+    if partitions < 1 or connection.dialect.name != "postgresql":
+        Base.metadata.create_all(connection)
+        return
+
+    for table in Base.metadata.sorted_tables:
+        if table is contacts:
+            if not connection.dialect.has_table(connection, contacts.name):
+                for statement in partitioned_contacts_ddl(partitions):
+                    connection.execute(text(statement))
+        else:
+            table.create(connection, checkfirst=True)
@@ -0,0 +1,91 @@
+"""
+Ротація refresh-токенів із виявленням повторного використання.
+
+Кожен вхід відкриває «сім'ю» токенів (сесію пристрою). Стан усіх сімей
+користувача — один хеш Redis ``refresh:{email}``: поле — id сім'ї, значення —
+номер покоління її чинного токена. Токен містить ``fam`` і ``gen``.
+
+Оновлення виконує одну атомарну команду ``HINCRBY``: якщо нове покоління на
+одиницю більше за покоління токена, токен чинний і замінюється наступним.
+Інакше цей токен уже використовували (або сім'ю відкликано) — сім'я
+видаляється, і всі її токени, зокрема вкрадені, стають недійсними.
+
+Хеш живе ``REFRESH_TOKEN_EXPIRE_DAYS`` від останнього входу чи оновлення і
+містить не більше ``MAX_FAMILIES`` невеликих полів, тож Redis зберігає його в
+компактному кодуванні listpack. Оновлення не звертається до бази даних і не
+перевіряє пароль.
+"""
+import secrets
+import time
+from typing import Tuple
+
+from fastapi import HTTPException, status
+
+from app.auth import REFRESH_TOKEN_EXPIRE_DAYS, create_refresh_token, verify_token
+
+# Найстаріші сесії витісняються, коли користувач входить з нового пристрою
+MAX_FAMILIES = 10
+FAMILY_TTL_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+
+def _key(email: str) -> str:
+    return f"refresh:{email}"
+
+
+def _new_family() -> str:
+    # Час створення на початку id: лексикографічний порядок полів збігається з віком сімей
+    return f"{int(time.time()):x}{secrets.token_hex(3)}"
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _invalid() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+
+async def issue_refresh_token(redis, email: str) -> str:
+    """
+    Відкриває нову сім'ю токенів під час входу.
+
+    :param redis: Асинхронний клієнт Redis
+    :param email: Email користувача
+    :return: Refresh-токен першого покоління
+    """
+    key = _key(email)
+    family = _new_family()
+    # Одна транзакція MULTI/EXEC: хеш не лишається без TTL, а вхід коштує одне звернення до Redis
+    async with redis.pipeline(transaction=True) as pipeline:
+        _, _, fields = await pipeline.hset(key, family, 1).expire(key, FAMILY_TTL_SECONDS).hkeys(key).execute()
+
+    families = sorted(_decode(field) for field in fields)
+    if len(families) > MAX_FAMILIES:
+        await redis.hdel(key, *families[:len(families) - MAX_FAMILIES])
+    return create_refresh_token({"sub": email, "fam": family, "gen": 1})
+
+
+async def rotate_refresh_token(redis, token: str) -> Tuple[str, str]:
+    """
+    Обмінює refresh-токен на наступний у тій самій сім'ї.
+
+    :param redis: Асинхронний клієнт Redis
+    :param token: Refresh-токен клієнта
+    :return: Email користувача і новий refresh-токен
+    :raises HTTPException: 401, якщо токен недійсний, прострочений, відкликаний
+        або вже використаний; у двох останніх випадках сім'я відкликається
+    """
+    payload = verify_token(token)
+    if payload.get("typ") != "refresh" or not {"sub", "fam", "gen"} <= payload.keys():
+        raise _invalid()
+
+    key = _key(payload["sub"])
+    generation = await redis.hincrby(key, payload["fam"], 1)
+    if generation != payload["gen"] + 1:
+        # Повторне використання або відкликана сім'я (HINCRBY щойно створив поле зі значенням 1)
+        await redis.hdel(key, payload["fam"])
+        raise _invalid()
+
+    await redis.expire(key, FAMILY_TTL_SECONDS)
+    return payload["sub"], create_refresh_token({"sub": payload["sub"], "fam": payload["fam"], "gen": generation})
+
@@ -0,0 +1,272 @@
+"""
+Планувальник нагадувань про дні народження контактів.
+
+Воркер періодично обробляє вікно днів від контрольної точки до сьогодні:
+
+* один запит вибирає контакти всіх власників, чиї дні народження припадають на
+  дні вікна, зсунуті на ``lead_days`` вперед;
+* результати групуються за власником, і кожен власник отримує один
+  лист-дайджест через ``app.dependencies.send_birthday_digest``;
+* листи надсилаються пакетами по ``batch_size``; після кожного пакета в
+  ``reminder_deliveries`` записується, кому лист уже надіслано;
+* після вікна контрольна точка (``reminder_checkpoints``) переходить на його
+  кінець, навіть якщо частину листів не вдалося надіслати.
+
+Перезапуск посеред вікна повторно надсилає хіба що листи пакета, прогрес
+якого не встиг записатися, а простій не пропускає днів: наступний запуск
+обробить усі пропущені дні одним вікном. Невдалі відправлення записуються в
+``reminder_failures`` і повторюються наступними запусками разом з їхніми
+вікнами, доки не вичерпано ``max_attempts`` спроб; після цього запис лишається
+як недоставлений. Так один адресат, якому лист не доходить ніколи, не
+зупиняє контрольну точку і не розтягує вікно до ``MAX_WINDOW_DAYS``.
+
+Планувальник запускається окремим процесом, один екземпляр на базу::
+
+    python -m app.reminders --interval 3600
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, extract, select, tuple_
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.dependencies import send_birthday_digest
+from app.log import setup_logging, stop_logging
+from app.models import Contact, ReminderCheckpoint, ReminderDelivery, ReminderFailure
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "birthdays"
+# Дні місяця однаково кодуються щороку, тож вікно довше за рік нічого не додає
+MAX_WINDOW_DAYS = 365
+
+Digest = List[Tuple[str, date]]
+Sender = Callable[[str, Digest], Awaitable[None]]
+
+
+def _month_day(day: date) -> int:
+    return day.month * 100 + day.day
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def occurrences(first: date, last: date) -> Dict[int, date]:
+    """
+    Зіставляє кожен день місяця (``MMDD``) з датою в проміжку ``[first, last]``.
+
+    У невисокосний рік дні народження 29 лютого відзначаються 28 лютого.
+
+    :param first: Перша дата
+    :param last: Остання дата включно
+    :return: Словник ``MMDD -> дата``
+    """
+    result = {}
+    day = first
+    while day <= last:
+        result[_month_day(day)] = day
+        if day.month == 2 and day.day == 28 and not _is_leap(day.year):
+            result[229] = day
+        day += timedelta(days=1)
+    return result
+
+
+class BirthdayReminderScheduler:
+    """
+    Надсилає власникам дайджести днів народження їхніх контактів.
+
+    :param session_factory: Фабрика ``AsyncSession``
+    :param send: Функція відправлення дайджесту власнику
+    :param clock: Повертає поточну дату; у тестах підміняється
+    :param lead_days: За скільки днів до дня народження надсилати нагадування
+    :param batch_size: Скільки листів надсилати одночасно між записами прогресу
+    :param max_attempts: Скільки разів пробувати надіслати дайджест, перш ніж відмовитися
+    """
+
+    def __init__(self, session_factory: sessionmaker, send: Sender = send_birthday_digest,
+                 clock: Callable[[], date] = date.today, lead_days: int = 1, batch_size: int = 50,
+                 max_attempts: int = 3):
+        self.session_factory = session_factory
+        self.send = send
+        self.clock = clock
+        self.lead_days = lead_days
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    async def _window(self, session) -> Tuple[date, date]:
+        today = self.clock()
+        last_date = await session.scalar(
+            select(ReminderCheckpoint.last_date).where(ReminderCheckpoint.name == CHECKPOINT_NAME)
+        )
+        start = today if last_date is None else last_date + timedelta(days=1)
+        return max(start, today - timedelta(days=MAX_WINDOW_DAYS - 1)), today
+
+    async def _pending_digests(self, session, first: date, last: date) -> Dict[str, Digest]:
+        dates = occurrences(first, last)
+        # Невдалі відправлення попередніх вікон, для яких ще лишилися спроби
+        retries = set((await session.execute(
+            select(ReminderFailure.user_email, ReminderFailure.occurs_on)
+            .where(ReminderFailure.attempts < self.max_attempts, ReminderFailure.occurs_on < first)
+        )).all())
+        retry_dates: Dict[int, date] = {}
+        for _, occurs_on in retries:
+            retry_dates.update(occurrences(occurs_on, occurs_on))
+        if not dates and not retry_dates:
+            return {}
+
+        month_day = extract("month", Contact.birthday) * 100 + extract("day", Contact.birthday)
+        result = await session.execute(
+            select(Contact.user_email, Contact.first_name, Contact.last_name, month_day.label("month_day"))
+            .where(Contact.birthday.isnot(None), month_day.in_(list(dates.keys() | retry_dates.keys())))
+            .order_by(Contact.user_email, Contact.last_name, Contact.first_name)
+        )
+        delivered = set((await session.execute(
+            select(ReminderDelivery.user_email, ReminderDelivery.occurs_on)
+            .where(ReminderDelivery.occurs_on.between(first, last))
+        )).all())
+
+        digests: Dict[str, Digest] = defaultdict(list)
+        for user_email, first_name, last_name, contact_month_day in result:
+            contact_month_day = int(contact_month_day)
+            if contact_month_day in dates:
+                occurs_on = dates[contact_month_day]
+                if (user_email, occurs_on) in delivered:
+                    continue
+            elif (user_email, retry_dates[contact_month_day]) in retries:
+                occurs_on = retry_dates[contact_month_day]
+            else:
+                continue
+            name = " ".join(part for part in (first_name, last_name) if part)
+            digests[user_email].append((name, occurs_on))
+        for digest in digests.values():
+            digest.sort(key=lambda item: item[1])
+        return digests
+
+    async def _send_batch(self, batch: List[Tuple[str, Digest]]) -> int:
+        results = await asyncio.gather(*(self.send(email, digest) for email, digest in batch),
+                                       return_exceptions=True)
+        delivered, failed = [], []
+        for (email, digest), error in zip(batch, results):
+            days = [(email, occurs_on) for occurs_on in sorted({occurs_on for _, occurs_on in digest})]
+            if isinstance(error, Exception):
+                logger.warning("Birthday digest for %s was not sent: %r", email, error)
+                failed.extend(days)
+            else:
+                delivered.extend(days)
+        async with self.session_factory() as session:
+            session.add_all(ReminderDelivery(occurs_on=occurs_on, user_email=email) for email, occurs_on in delivered)
+            if delivered:
+                await session.execute(delete(ReminderFailure).where(
+                    tuple_(ReminderFailure.user_email, ReminderFailure.occurs_on).in_(delivered)))
+            for email, occurs_on in failed:
+                await self._record_failure(session, email, occurs_on)
+            await session.commit()
+        return len(batch) - sum(isinstance(error, Exception) for error in results)
+
+    async def _record_failure(self, session, email: str, occurs_on: date) -> None:
+        failure = await session.get(ReminderFailure, (occurs_on, email))
+        if failure is None:
+            failure = ReminderFailure(occurs_on=occurs_on, user_email=email, attempts=0)
+            session.add(failure)
+        failure.attempts += 1
+        if failure.attempts >= self.max_attempts:
+            logger.error("Giving up on birthday digest for %s (%s) after %d attempts",
+                         email, occurs_on, failure.attempts)
+
+    async def run_once(self) -> int:
+        """
+        Обробляє одне вікно від контрольної точки до сьогодні.
+
+        :return: Кількість надісланих дайджестів
+        """
+        async with self.session_factory() as session:
+            start, end = await self._window(session)
+            first, last = start + timedelta(days=self.lead_days), end + timedelta(days=self.lead_days)
+            # Порожнє вікно (повторний запуск того самого дня) все одно повторює невдалі відправлення
+            digests = list((await self._pending_digests(session, first, last)).items())
+
+        sent = 0
+        for offset in range(0, len(digests), self.batch_size):
+            sent += await self._send_batch(digests[offset:offset + self.batch_size])
+        if start > end:
+            return sent
+
+        # Невдалі відправлення вже записані в reminder_failures, тож контрольна точка рухається
+        async with self.session_factory() as session:
+            checkpoint = await session.get(ReminderCheckpoint, CHECKPOINT_NAME)
+            if checkpoint is None:
+                session.add(ReminderCheckpoint(name=CHECKPOINT_NAME, last_date=end))
+            else:
+                checkpoint.last_date = end
+            # Записи про доставку потрібні лише, доки вікно не завершене
+            await session.execute(delete(ReminderDelivery).where(ReminderDelivery.occurs_on <= last))
+            await session.commit()
+        return sent
+
+    async def run(self, interval: float = 3600, stop: Optional[asyncio.Event] = None) -> None:
+        """
+        Обробляє вікна кожні ``interval`` секунд, доки не встановлено ``stop``.
+
+        :param interval: Пауза між запусками в секундах
+        :param stop: Подія зупинки
+        """
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                sent = await self.run_once()
+                if sent:
+                    logger.info("Sent %d birthday digests", sent)
+            except Exception:
+                logger.exception("Birthday reminder run failed")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _serve(args) -> None:
+    from app.database import dispose_engine, get_sessionmaker
+    from app.resources import close_resources
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            # Windows: зупинка через KeyboardInterrupt
+            pass
+
+    scheduler = BirthdayReminderScheduler(get_sessionmaker(), lead_days=args.lead_days, batch_size=args.batch_size,
+                                          max_attempts=args.max_attempts)
+    try:
+        await scheduler.run(args.interval, stop)
+    finally:
+        await close_resources()
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send birthday reminder digests to contact owners")
+    parser.add_argument("--interval", type=float, default=3600, help="seconds between runs")
+    parser.add_argument("--lead-days", type=int, default=1, help="days before a birthday to remind")
+    parser.add_argument("--batch-size", type=int, default=50, help="digests sent concurrently")
+    parser.add_argument("--max-attempts", type=int, default=3, help="attempts per digest before giving up")
+    args = parser.parse_args()
+    settings = get_settings()
+    listener = setup_logging(settings.log_level, settings.log_sample_rate)
+    try:
+        asyncio.run(_serve(args))
+    finally:
+        stop_logging(listener)
+
+
+if __name__ == "__main__":
+    main()
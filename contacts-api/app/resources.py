@@ -0,0 +1,82 @@
+import os
+
+from app.config import get_settings
+
+# Зовнішні клієнти створюються під час першого використання. Важкі бібліотеки
+# (redis, fastapi_mail, cloudinary) імпортуються всередині функцій, щоб не
+# сповільнювати імпорт застосунку і збирання тестів.
+_redis = None
+_mail = None
+_storage_configured = False
+
+
+def get_redis():
+    """
+    Повертає асинхронний клієнт Redis, створюючи його за потреби.
+
+    Підключення до сервера відкривається пулом лише під час першої команди.
+
+    :return: Клієнт ``redis.asyncio.Redis``
+    """
+    global _redis
+    if _redis is None:
+        from redis import asyncio as aioredis
+
+        _redis = aioredis.from_url(get_settings().redis_url)
+    return _redis
+
+
+def get_mail():
+    """
+    Повертає клієнт FastMail, налаштований з ``Settings``.
+
+    :return: Екземпляр ``FastMail``
+    :raises RuntimeError: Якщо параметри пошти не задано
+    """
+    global _mail
+    if _mail is None:
+        from fastapi_mail import ConnectionConfig, FastMail
+
+        settings = get_settings()
+        if not settings.mail_server or not settings.mail_from:
+            raise RuntimeError("Mail is not configured")
+        _mail = FastMail(ConnectionConfig(
+            MAIL_USERNAME=settings.mail_username or "",
+            MAIL_PASSWORD=settings.mail_password or "",
+            MAIL_FROM=settings.mail_from,
+            MAIL_PORT=settings.mail_port,
+            MAIL_SERVER=settings.mail_server,
+            MAIL_STARTTLS=settings.mail_starttls,
+            MAIL_SSL_TLS=settings.mail_ssl_tls,
+            USE_CREDENTIALS=bool(settings.mail_username),
+        ))
+    return _mail
+
+
+def configure_storage() -> None:
+    """
+    Налаштовує Cloudinary під час першого завантаження файлу.
+    """
+    global _storage_configured
+    if _storage_configured:
+        return
+    import cloudinary
+
+    cloudinary_url = get_settings().cloudinary_url
+    if cloudinary_url:
+        os.environ["CLOUDINARY_URL"] = cloudinary_url
+        cloudinary.reset_config()
+    _storage_configured = True
+
+
+async def close_resources() -> None:
+    """
+    Закриває створені клієнти та скидає їх, щоб наступний старт створив нові.
+    """
+    global _redis, _mail, _storage_configured
+    redis = _redis
+    _redis = None
+    _mail = None
+    _storage_configured = False
+    if redis is not None:
+        await redis.aclose()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 
@@ -7,9 +7,9 @@ class ContactBase(BaseModel):
     first_name: str
     last_name: str
     email: EmailStr
-    phone: Optional[str]
-    birthday: Optional[date]
-    additional_data: Optional[str]
+    phone: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_data: Optional[str] = None
 
 
 class ContactCreate(ContactBase):
@@ -24,8 +24,37 @@ class Contact(ContactBase):
     id: int
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
-class UserCreate:
-    pass
\ No newline at end of file
+class ContactBatch(BaseModel):
+    contacts: List[Contact]
+    # Запитані id, яких немає серед контактів власника, у порядку запиту
+    missing: List[int]
+
+
+class TagCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=64)
+
+
+class Tag(BaseModel):
+    id: int
+    name: str
+    contacts: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class TagAssignment(BaseModel):
+    tags: List[str] = Field(min_length=1, max_length=100)
+    contact_ids: List[int] = Field(min_length=1, max_length=10_000)
+
+
+class UserCreate(BaseModel):
+    email: EmailStr
+    password: str
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
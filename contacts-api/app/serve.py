@@ -0,0 +1,48 @@
+"""
+Запуск застосунку в кількох процесах.
+
+Стан, що лишається після переходу з одного воркера на N:
+
+* rate limit (``slowapi``) — лічильники в Redis (``rate_limit_storage_uri`` або
+  ``redis_url``), тому ліміт спільний для всіх воркерів;
+* кеш користувача після входу та ``FastAPICache`` — у Redis, спільні;
+* клієнт Redis, рушій бази даних, клієнти пошти і сховища — окремі в кожному
+  воркері; створюються ліниво після ``fork`` і закриваються в ``lifespan``;
+* ``CryptContext`` з ``app.auth`` — окремий у кожному воркері, не має змінного стану.
+
+Під час імпорту ``app.main`` не відкривається жодне підключення, тому застосунок
+можна попередньо завантажувати в головному процесі (``preload_app`` у
+``gunicorn.conf.py``). Цей модуль запускає воркери через uvicorn без
+попереднього завантаження і підходить також для Windows::
+
+    python -m app.serve --workers 4
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run contacts-api with several worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="seconds to finish in-flight requests on shutdown")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=os.getenv("LOG_LEVEL", "info"),
+        # Журнал доступу з id запиту пише app.log.RequestIdMiddleware через чергу
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import asyncio
+import email
+import email.policy
+import time
+
+
+class FakeRedis:
+    """
+    Мінімальна заміна асинхронного клієнта Redis для тестів.
+
+    Підтримує лише команди, які використовує застосунок; значення, як і в
+    ``redis.asyncio``, повертаються у вигляді ``bytes``.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        # Кількість виконаних транзакцій MULTI/EXEC
+        self.transactions = 0
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    async def get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = self._encode(value)
+        self.expires.pop(key, None)
+        if ex is not None:
+            self.expires[key] = time.monotonic() + ex
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    async def exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    async def expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        self.expires[key] = time.monotonic() + seconds
+        return True
+
+    def _hash(self, key):
+        if not self._alive(key):
+            self.data[key] = {}
+        return self.data[key]
+
+    async def hset(self, key, field, value):
+        fields = self._hash(key)
+        added = self._encode(field) not in fields
+        fields[self._encode(field)] = self._encode(value)
+        return int(added)
+
+    async def hincrby(self, key, field, amount=1):
+        fields = self._hash(key)
+        value = int(fields.get(self._encode(field), b"0")) + amount
+        fields[self._encode(field)] = self._encode(value)
+        return value
+
+    async def hdel(self, key, *fields):
+        if not self._alive(key):
+            return 0
+        stored = self.data[key]
+        removed = sum(1 for field in fields if stored.pop(self._encode(field), None) is not None)
+        if not stored:
+            await self.delete(key)
+        return removed
+
+    async def hkeys(self, key):
+        return list(self.data[key]) if self._alive(key) else []
+
+    async def hgetall(self, key):
+        return dict(self.data[key]) if self._alive(key) else {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    """
+    Транзакція ``FakeRedis``: команди накопичуються і виконуються разом в ``execute``, як MULTI/EXEC.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        commands, self.commands = self.commands, []
+        self.redis.transactions += 1
+        return [await command(*args, **kwargs) for command, args, kwargs in commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+
+class FakeSMTPServer:
+    """
+    Локальний SMTP-сервер для тестів відправлення пошти.
+
+    Приймає листи без автентифікації і TLS та зберігає їх у ``messages`` як
+    кортежі ``(відправник, отримувачі, декодований текст усіх частин листа)``.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.port = None
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        writer.write(b"220 localhost ESMTP\r\n")
+        sender, recipients = None, []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                writer.write(b"250-localhost\r\n250 8BITMIME\r\n")
+            elif verb == "MAIL":
+                sender = command.split("<", 1)[1].split(">", 1)[0]
+                writer.write(b"250 OK\r\n")
+            elif verb == "RCPT":
+                recipients.append(command.split("<", 1)[1].split(">", 1)[0])
+                writer.write(b"250 OK\r\n")
+            elif verb == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = []
+                while (line := await reader.readline()) not in (b".\r\n", b""):
+                    data.append(line)
+                message = email.message_from_bytes(b"".join(data), policy=email.policy.default)
+                text = "".join(part.get_content() for part in message.walk() if part.get_content_maintype() == "text")
+                self.messages.append((sender, recipients, text))
+                sender, recipients = None, []
+                writer.write(b"250 OK\r\n")
+            elif verb in ("HELO", "RSET", "NOOP"):
+                writer.write(b"250 OK\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"502 Not implemented\r\n")
+            await writer.drain()
+        writer.close()
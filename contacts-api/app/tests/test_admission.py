@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+
+from app import admission
+from app.admission import AdmissionControl, RouteClass, classify, database_overload_handler
+from app.database import route_statement_timeout
+
+
+@pytest.mark.parametrize("method, path, route_class", [
+    ("POST", "/token", "auth"),
+    ("POST", "/token/refresh", "writes"),
+    ("GET", "/contacts", "reads"),
+    ("GET", "/contacts/1", "reads"),
+    ("POST", "/contacts", "writes"),
+    ("POST", "/contacts/import", "bulk"),
+    ("DELETE", "/contacts/tags", "bulk"),
+    ("GET", "/healthz", None),
+])
+def test_classify(method, path, route_class):
+    """Маршрути розподіляються за класами, перевірка готовності не обмежується"""
+    assert classify(method, path) == route_class
+
+
+class BlockingApp:
+    """ASGI-застосунок, що тримає запити до release і запам'ятовує statement_timeout"""
+
+    def __init__(self):
+        self.started = 0
+        self.release = asyncio.Event()
+        self.timeouts = []
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        self.timeouts.append(route_statement_timeout.get())
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def admission_client(inner, **route_class):
+    route_classes = {"reads": RouteClass("reads", **{"concurrency": 1, "queue": 1, "queue_timeout": 5.0, **route_class})}
+    middleware = AdmissionControl(inner, route_classes)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test")
+    return middleware, client
+
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+async def test_sheds_requests_beyond_queue():
+    """Запити понад межу і чергу одразу отримують 503 з Retry-After"""
+    inner = BlockingApp()
+    middleware, client = admission_client(inner, statement_timeout=0.5)
+    async with client:
+        running = [asyncio.create_task(client.get("/contacts")) for _ in range(2)]
+        await wait_until(lambda: inner.started == 1 and middleware.gates["reads"].waiting == 1)
+
+        rejected = await client.get("/contacts")
+        inner.release.set()
+        responses = await asyncio.gather(*running)
+
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "5"
+    assert [response.status_code for response in responses] == [200, 200]
+    assert inner.timeouts == [0.5, 0.5]
+    assert route_statement_timeout.get() is None
+
+
+async def test_queue_timeout():
+    """Запит, що простояв у черзі довше queue_timeout, відхиляється"""
+    inner = BlockingApp()
+    _, client = admission_client(inner, queue_timeout=0.05)
+    async with client:
+        running = asyncio.create_task(client.get("/contacts"))
+        await wait_until(lambda: inner.started == 1)
+
+        queued = await client.get("/contacts")
+        inner.release.set()
+        await running
+
+    assert queued.status_code == 503
+    assert inner.started == 1
+
+
+async def test_unclassified_routes_bypass_limits():
+    """Маршрути без класу не обмежуються"""
+    inner = BlockingApp()
+    inner.release.set()
+    _, client = admission_client(inner, concurrency=1, queue=0)
+    async with client:
+        responses = await asyncio.gather(*(client.get("/healthz") for _ in range(3)))
+
+    assert [response.status_code for response in responses] == [200] * 3
+
+
+async def test_shed_response_has_cors_headers(client, auth_headers, monkeypatch):
+    """Відповідь 503 має заголовки CORS, а preflight-запит не займає місця класу reads"""
+    monkeypatch.setitem(admission.ROUTE_CLASSES, "reads", RouteClass("reads", concurrency=0, queue=0, queue_timeout=1.0))
+    origin = {"Origin": "http://frontend.example.com"}
+
+    shed = await client.get("/contacts", headers={**auth_headers, **origin})
+    preflight = await client.options("/contacts", headers={**origin, "Access-Control-Request-Method": "GET"})
+
+    assert shed.status_code == 503
+    assert "Access-Control-Allow-Origin" in shed.headers
+    assert preflight.status_code == 200
+
+
+async def test_database_overload_handler():
+    """Вичерпаний пул і перерваний за statement_timeout запит стають 503, інші помилки — ні"""
+    canceled = DBAPIError("SELECT 1", {}, SimpleNamespace(sqlstate="57014"))
+    other = DBAPIError("SELECT 1", {}, SimpleNamespace(sqlstate="23505"))
+
+    assert (await database_overload_handler(None, PoolTimeoutError())).status_code == 503
+    assert (await database_overload_handler(None, canceled)).headers["Retry-After"] == "1"
+    with pytest.raises(DBAPIError):
+        await database_overload_handler(None, other)
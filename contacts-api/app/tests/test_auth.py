@@ -1,21 +1,22 @@
-import unittest
-from app.auth import authenticate_user
+from app.auth import get_pwd_context, hash_password, verify_password
 
 
-class TestAuth(unittest.TestCase):
+def test_hash_password_is_salted():
+    """Однаковий пароль дає різні хеші bcrypt"""
+    first, second = hash_password("password123"), hash_password("password123")
 
-    def test_authenticate_user_success(self):
-        """Тестування успішної аутентифікації"""
-        self.assertTrue(authenticate_user("admin", "password123"))
+    assert first != second
+    assert first.startswith("$2b$")
 
-    def test_authenticate_user_failure(self):
-        """Тестування невдалої аутентифікації з неправильним паролем"""
-        self.assertFalse(authenticate_user("admin", "wrongpassword"))
 
-    def test_authenticate_user_no_user(self):
-        """Тестування невдалої аутентифікації з неправильним ім'ям користувача"""
-        self.assertFalse(authenticate_user("wronguser", "password123"))
+def test_verify_password():
+    """Перевірка приймає правильний пароль і відхиляє неправильний"""
+    hashed = hash_password("password123")
 
+    assert verify_password("password123", hashed)
+    assert not verify_password("wrongpassword", hashed)
 
-if __name__ == '__main__':
-    unittest.main()
+
+def test_pwd_context_is_created_once():
+    """Контекст хешування створюється один раз"""
+    assert get_pwd_context() is get_pwd_context()
@@ -1,9 +1,90 @@
-from fastapi.testclient import TestClient
-from main import app
+import asyncio
+import time
 
-client = TestClient(app)
+from app.auth import create_refresh_token, hash_password, verify_token
+from app.models import User
+
+
+async def add_user(db_session, email="test@example.com", password="password123"):
+    db_session.add(User(email=email, hashed_password=hash_password(password)))
+    await db_session.commit()
+
+
+async def test_login(client, db_session, redis):
+    """Вхід повертає токени доступу й оновлення та кешує користувача в Redis"""
+    await add_user(db_session)
+
+    response = await client.post("/token", data={"username": "test@example.com", "password": "password123"})
 
-def test_login():
-    response = client.post("/login", json={"email": "test@example.com", "password": "password123"})
     assert response.status_code == 200
-    assert "access_token" in response.json()
+    body = response.json()
+    assert verify_token(body["access_token"])["sub"] == "test@example.com"
+    assert verify_token(body["refresh_token"])["typ"] == "refresh"
+    assert await redis.get("user:test@example.com") == b"test@example.com"
+
+
+async def test_login_with_wrong_password(client, db_session):
+    """Неправильний пароль або невідомий користувач отримують 401"""
+    await add_user(db_session)
+
+    wrong_password = await client.post("/token", data={"username": "test@example.com", "password": "wrong"})
+    unknown_user = await client.post("/token", data={"username": "nobody@example.com", "password": "password123"})
+
+    assert wrong_password.status_code == unknown_user.status_code == 401
+
+
+async def test_password_check_does_not_block_event_loop(client, db_session, monkeypatch):
+    """Перевірка пароля виконується в пулі потоків, і цикл подій тим часом обслуговує інші задачі"""
+    await add_user(db_session)
+
+    def slow_verify(plain_password, hashed_password):
+        time.sleep(0.3)
+        return False
+
+    monkeypatch.setattr("app.main.verify_password", slow_verify)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    response = await client.post("/token", data={"username": "test@example.com", "password": "password123"})
+    ticker.cancel()
+
+    assert response.status_code == 401
+    assert ticks >= 10
+
+
+async def test_refresh_after_login(client, db_session):
+    """Токен оновлення з входу обмінюється на нову пару токенів лише один раз"""
+    await add_user(db_session)
+    login = await client.post("/token", data={"username": "test@example.com", "password": "password123"})
+    refresh_token = login.json()["refresh_token"]
+
+    refreshed = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+    reused = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+    assert refreshed.status_code == 200
+    assert verify_token(refreshed.json()["access_token"])["sub"] == "test@example.com"
+    assert reused.status_code == 401
+
+
+async def test_protected_route_requires_token(client):
+    """Без токену доступу маршрути контактів повертають 401"""
+    assert (await client.get("/contacts")).status_code == 401
+    assert (await client.get("/contacts", headers={"Authorization": "Bearer invalid"})).status_code == 401
+
+
+async def test_refresh_token_is_not_an_access_token(client, storage):
+    """Токен оновлення не приймається захищеними маршрутами, зокрема завантаженням аватара"""
+    headers = {"Authorization": f"Bearer {create_refresh_token({'sub': 'test@example.com'})}"}
+
+    avatar = await client.post("/users/me/avatar", files={"file": ("avatar.png", b"avatar data", "image/png")},
+                               headers=headers)
+
+    assert avatar.status_code == 401
+    assert storage == []
+    assert (await client.get("/contacts", headers=headers)).status_code == 401
@@ -1,62 +1,54 @@
-import unittest
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from your_module import (
-    hash_password,
-    verify_password,
+
+from jose import jwt
+
+from app.auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    SECRET_KEY,
     create_access_token,
     create_refresh_token,
     verify_token,
-    SECRET_KEY,
-    ALGORITHM,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
-    REFRESH_TOKEN_EXPIRE_DAYS
 )
 
-class TestAuthService(unittest.TestCase):
-
-    def setUp(self):
-        """Ініціалізація перед кожним тестом"""
-        self.password = "testpassword"
-        self.hashed_password = hash_password(self.password)
-        self.data = {"email": "test@example.com"}
-        self.access_token = create_access_token(self.data)
-        self.refresh_token = create_refresh_token(self.data)
-
-    def test_hash_password(self):
-        """Тестування хешування пароля"""
-        self.assertTrue(verify_password(self.password, self.hashed_password))
-        self.assertFalse(verify_password("wrongpassword", self.hashed_password))
-
-    def test_create_access_token(self):
-        """Тестування створення токену доступу"""
-        payload = verify_token(self.access_token)
-        self.assertEqual(payload["email"], self.data["email"])
-        # Перевірка терміну дії токену
-        expire = datetime.utcfromtimestamp(payload["exp"])
-        self.assertTrue(expire > datetime.utcnow())
-        self.assertTrue(expire <= datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-
-    def test_create_refresh_token(self):
-        """Тестування створення токену оновлення"""
-        payload = verify_token(self.refresh_token)
-        self.assertEqual(payload["email"], self.data["email"])
-        # Перевірка терміну дії токену
-        expire = datetime.utcfromtimestamp(payload["exp"])
-        self.assertTrue(expire > datetime.utcnow())
-        self.assertTrue(expire <= datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-
-    def test_verify_token(self):
-        """Тестування перевірки токену"""
-        payload = verify_token(self.access_token)
-        self.assertEqual(payload["email"], self.data["email"])
-        self.assertTrue("exp" in payload)
-
-        # Перевірка токену з неправильним секретним ключем
-        invalid_token = self.access_token + "invalid"
-        self.assertEqual(verify_token(invalid_token), {})
-
-if __name__ == '__main__':
-    unittest.main()
+
+def expires_at(token: str) -> datetime:
+    return datetime.utcfromtimestamp(verify_token(token)["exp"])
+
+
+def test_create_access_token():
+    """Токен доступу містить дані користувача і спливає за ACCESS_TOKEN_EXPIRE_MINUTES"""
+    token = create_access_token({"sub": "test@example.com"})
+
+    assert verify_token(token)["sub"] == "test@example.com"
+    assert "typ" not in verify_token(token)
+    assert datetime.utcnow() < expires_at(token) <= datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+def test_create_access_token_with_custom_expiry():
+    """Термін дії токену доступу можна задати явно"""
+    token = create_access_token({"sub": "test@example.com"}, expires_delta=timedelta(minutes=1))
+
+    assert expires_at(token) <= datetime.utcnow() + timedelta(minutes=1)
+
+
+def test_create_refresh_token():
+    """Токен оновлення позначений типом refresh і живе REFRESH_TOKEN_EXPIRE_DAYS"""
+    token = create_refresh_token({"sub": "test@example.com"})
+
+    assert verify_token(token)["typ"] == "refresh"
+    assert expires_at(token) > datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    assert expires_at(token) <= datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def test_verify_token_rejects_invalid_tokens():
+    """Пошкоджений, чужий або прострочений токен не проходить перевірку"""
+    token = create_access_token({"sub": "test@example.com"})
+    foreign = jwt.encode({"sub": "test@example.com"}, "another-secret", algorithm=ALGORITHM)
+    expired = jwt.encode({"sub": "test@example.com", "exp": datetime.utcnow() - timedelta(minutes=1)},
+                         SECRET_KEY, algorithm=ALGORITHM)
+
+    assert verify_token(token + "invalid") == {}
+    assert verify_token(foreign) == {}
+    assert verify_token(expired) == {}
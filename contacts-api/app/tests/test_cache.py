@@ -0,0 +1,146 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi_cache.backends.redis import RedisBackend
+
+from app.cache import CoalescingCache, SingleFlight
+from app.models import Contact
+from app.tests.fakes import FakeRedis
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_loader(calls, value="value", delay=0.05):
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+    return loader
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    """Одночасні виклики з однаковим ключем виконують завантажувач один раз"""
+    flight = SingleFlight()
+    calls = []
+
+    results = await asyncio.gather(*(flight.do("key", make_loader(calls)) for _ in range(500)))
+
+    assert calls == [1]
+    assert set(results) == {"value"}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors():
+    """Виняток завантажувача отримують усі очікувачі, а наступний виклик починає заново"""
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_leader():
+    """Скасування першого виклику не скасовує завантаження для решти очікувачів"""
+    flight = SingleFlight()
+    calls = []
+    callers = [asyncio.create_task(flight.do("key", make_loader(calls))) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    callers[0].cancel()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["value", "value"]
+    assert calls == [1]
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    """500 одночасних промахів звертаються до джерела даних лише раз"""
+    cache = CoalescingCache(RedisBackend(FakeRedis()), ttl=60)
+    calls = []
+
+    results = await asyncio.gather(*(cache.get_or_load("key", make_loader(calls)) for _ in range(500)))
+
+    assert calls == [1]
+    assert set(results) == {"value"}
+    assert await cache.get_or_load("key", make_loader(calls)) == "value"
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_missing_value_is_not_cached():
+    """Результат None не зберігається: наступний запит знову звертається до джерела"""
+    cache = CoalescingCache(RedisBackend(FakeRedis()), ttl=60)
+    calls = []
+
+    assert await cache.get_or_load("key", make_loader(calls, None, delay=0)) is None
+    assert await cache.get_or_load("key", make_loader(calls, "created", delay=0)) == "created"
+    assert calls == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_revalidating():
+    """Після ttl віддається застарілий запис, а оновлення виконується у фоні один раз"""
+    clock = FakeClock()
+    cache = CoalescingCache(RedisBackend(FakeRedis()), ttl=60, stale_ttl=30, beta=0, clock=clock)
+    calls = []
+    await cache.get_or_load("key", make_loader(calls, "old", delay=0))
+
+    clock.now += 61
+    results = await asyncio.gather(*(cache.get_or_load("key", make_loader(calls, "new")) for _ in range(50)))
+    assert set(results) == {"old"}
+
+    await asyncio.sleep(0.1)
+    assert len(calls) == 2
+    assert await cache.get_or_load("key", make_loader(calls, "newer")) == "new"
+
+
+@pytest.mark.asyncio
+async def test_probabilistic_early_expiration():
+    """XFetch оновлює запис до завершення ttl, якщо завантаження триває довго"""
+    clock = FakeClock()
+    calls = []
+
+    async def slow_loader():
+        calls.append(1)
+        clock.now += 10
+        return len(calls)
+
+    cache = CoalescingCache(RedisBackend(FakeRedis()), ttl=60, beta=1000, clock=clock)
+    await cache.get_or_load("key", slow_loader)
+    clock.now += 59
+    assert await cache.get_or_load("key", slow_loader) == 2
+
+    cache.beta = 0
+    clock.now += 59
+    assert await cache.get_or_load("key", slow_loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_contact_hits_database_once(client, db_session, auth_headers, statements):
+    """500 одночасних запитів одного контакту виконують один SELECT"""
+    contact = Contact(first_name="John", last_name="Doe", email="john@example.com",
+                      birthday=datetime.date(1990, 1, 1), user_email="owner@example.com")
+    db_session.add(contact)
+    await db_session.commit()
+    statements.clear()
+
+    responses = await asyncio.gather(*(client.get(f"/contacts/{contact.id}", headers=auth_headers) for _ in range(500)))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len([statement for statement in statements if statement.startswith("SELECT")]) == 1
@@ -1,98 +1,118 @@
-import pytest
-from unittest.mock import AsyncMock, MagicMock
-from sqlalchemy.future import select
+from datetime import date
+
+import pytest_asyncio
+
+from app import crud
 from app.models import Contact
 from app.schemas import ContactCreate, ContactUpdate
-from app.crud import get_contact, get_contacts, create_contact, update_contact, delete_contact
-
-
-@pytest.mark.asyncio
-@patch('app.crud.get_contact')
-async def test_get_contact(mock_get_contact):
-    # Мокування
-    mock_db_session = AsyncMock()
-    mock_contact = MagicMock(Contact)
-    mock_get_contact.return_value = mock_contact
-
-    result = await get_contact(mock_db_session, 1)
-
-    # Перевірка результату
-    assert result == mock_contact
-    mock_get_contact.assert_called_once_with(mock_db_session, 1)
-
-
-@pytest.mark.asyncio
-@patch('app.crud.get_contacts')
-async def test_get_contacts(mock_get_contacts):
-    # Мокування
-    mock_db_session = AsyncMock()
-    mock_contacts = [MagicMock(Contact), MagicMock(Contact)]
-    mock_get_contacts.return_value = mock_contacts
-
-    result = await get_contacts(mock_db_session, 0, 10)
-
-    # Перевірка результату
-    assert result == mock_contacts
-    mock_get_contacts.assert_called_once_with(mock_db_session, 0, 10)
-
-
-@pytest.mark.asyncio
-@patch('app.crud.Contact')
-@patch('app.crud.AsyncSession')
-async def test_create_contact(mock_AsyncSession, mock_Contact):
-    # Мокування
-    mock_db_session = AsyncMock()
-    mock_Contact.return_value = MagicMock(Contact)
-    mock_db_session.add = AsyncMock()
-    mock_db_session.commit = AsyncMock()
-    mock_db_session.refresh = AsyncMock()
-
-    contact_data = ContactCreate(name="John Doe", email="john@example.com")
-    result = await create_contact(mock_db_session, contact_data)
-
-    # Перевірка результату
-    mock_Contact.assert_called_once_with(**contact_data.dict())
-    mock_db_session.add.assert_called_once()
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once()
-    assert result == mock_Contact.return_value
-
-
-@pytest.mark.asyncio
-@patch('app.crud.get_contact')
-@patch('app.crud.AsyncSession')
-async def test_update_contact(mock_AsyncSession, mock_get_contact):
-    # Мокування
-    mock_db_session = AsyncMock()
-    mock_contact = MagicMock(Contact)
-    mock_get_contact.return_value = mock_contact
-    contact_update = ContactUpdate(name="Updated Name")
-
-    result = await update_contact(mock_db_session, 1, contact_update)
-
-    # Перевірка результату
-    mock_get_contact.assert_called_once_with(mock_db_session, 1)
-    mock_contact.__setattr__.assert_called_once_with('name', 'Updated Name')
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once()
-    assert result == mock_contact
-
-
-@pytest.mark.asyncio
-@patch('app.crud.get_contact')
-@patch('app.crud.AsyncSession')
-async def test_delete_contact(mock_AsyncSession, mock_get_contact):
-    # Мокування
-    mock_db_session = AsyncMock()
-    mock_contact = MagicMock(Contact)
-    mock_get_contact.return_value = mock_contact
-    mock_db_session.delete = AsyncMock()
-    mock_db_session.commit = AsyncMock()
-
-    result = await delete_contact(mock_db_session, 1)
-
-    # Перевірка результату
-    mock_get_contact.assert_called_once_with(mock_db_session, 1)
-    mock_db_session.delete.assert_called_once_with(mock_contact)
-    mock_db_session.commit.assert_called_once()
-    assert result == mock_contact
+
+OWNER = "owner@example.com"
+
+
+@pytest_asyncio.fixture
+async def contact(db_session):
+    """Фікстура з контактом власника OWNER"""
+    return await crud.create_contact(
+        db_session, ContactCreate(first_name="John", last_name="Doe", email="john@example.com"), OWNER)
+
+
+async def test_create_contact(db_session, contact):
+    """Створений контакт повертається з id без окремого завантаження"""
+    assert contact.id is not None
+    assert (contact.first_name, contact.user_email) == ("John", OWNER)
+    assert await crud.get_contact(db_session, contact.id, OWNER) is contact
+
+
+async def test_get_contact_of_another_owner(db_session, contact):
+    """Чужий контакт не знаходиться"""
+    assert await crud.get_contact(db_session, contact.id, "other@example.com") is None
+
+
+async def test_get_contacts_paginates(db_session):
+    """Список контактів обмежується skip і limit"""
+    ids = await crud.create_contacts(db_session, [
+        ContactCreate(first_name=f"John{i}", last_name="Doe", email=f"john{i}@example.com") for i in range(5)
+    ], OWNER)
+
+    page = await crud.get_contacts(db_session, OWNER, skip=1, limit=2)
+
+    assert len(ids) == 5
+    assert len(page) == 2
+    assert await crud.get_contacts(db_session, "other@example.com") == []
+
+
+async def test_get_contacts_cursor(db_session):
+    """Курсор продовжує список за прізвищем та іменем без пропусків і повторів"""
+    names = [("Ann", "Young"), ("Bob", "Adams"), ("Al", "Adams"), ("Cid", "Moss"), ("Al", "Adams")]
+    await crud.create_contacts(db_session, [
+        ContactCreate(first_name=first, last_name=last, email=f"c{i}@example.com") for i, (first, last) in enumerate(names)
+    ], OWNER)
+
+    first_page = await crud.get_contacts(db_session, OWNER, limit=2)
+    last = first_page[-1]
+    second_page = await crud.get_contacts(db_session, OWNER, limit=10, after=(last.last_name, last.first_name, last.id))
+
+    listed = [(contact.last_name, contact.first_name) for contact in first_page + second_page]
+    assert listed == sorted((last, first) for first, last in names)
+
+
+async def test_get_contacts_by_tags(db_session):
+    """Фільтр за мітками: хоча б одна або всі, лише мітки власника"""
+    ids = await crud.create_contacts(db_session, [
+        ContactCreate(first_name=f"John{i}", last_name="Doe", email=f"john{i}@example.com") for i in range(3)
+    ], OWNER)
+    for name in ("work", "family"):
+        await crud.create_tag(db_session, name, OWNER)
+    await crud.create_tag(db_session, "work", "other@example.com")
+    await crud.assign_tags(db_session, OWNER, ["work"], ids[:2])
+    await crud.assign_tags(db_session, OWNER, ["family"], ids[1:])
+
+    tagged = lambda contacts: [contact.id for contact in contacts]
+    assert tagged(await crud.get_contacts(db_session, OWNER, tags=["work"])) == ids[:2]
+    assert tagged(await crud.get_contacts(db_session, OWNER, tags=["work", "family"])) == ids
+    assert tagged(await crud.get_contacts(db_session, OWNER, tags=["work", "family"], match_all=True)) == [ids[1]]
+    assert await crud.get_contacts(db_session, "other@example.com", tags=["work"]) == []
+
+
+async def test_assign_tags(db_session, contact):
+    """Масове додавання міток пропускає наявні пари, чужі контакти та неіснуючі мітки"""
+    other = await crud.create_contact(
+        db_session, ContactCreate(first_name="Eve", last_name="Smith", email="eve@example.com"), "other@example.com")
+    await crud.create_tag(db_session, "work", OWNER)
+
+    assert await crud.assign_tags(db_session, OWNER, ["work", "missing"], [contact.id, other.id]) == 1
+    assert await crud.assign_tags(db_session, OWNER, ["work"], [contact.id]) == 0
+    assert [(tag.name, count) for tag, count in await crud.get_tags(db_session, OWNER)] == [("work", 1)]
+
+    assert await crud.unassign_tags(db_session, OWNER, ["work"], [contact.id, other.id]) == 1
+    assert [(tag.name, count) for tag, count in await crud.get_tags(db_session, OWNER)] == [("work", 0)]
+
+
+async def test_get_contacts_by_ids(db_session, contact):
+    """Пакетне завантаження повертає лише знайдені контакти власника"""
+    assert await crud.get_contacts_by_ids(db_session, OWNER, []) == []
+    assert await crud.get_contacts_by_ids(db_session, OWNER, [contact.id, contact.id + 100]) == [contact]
+
+
+async def test_update_contact(db_session, contact):
+    """Оновлення змінює лише передані поля"""
+    updated = await crud.update_contact(
+        db_session, contact.id,
+        ContactUpdate(first_name="Jack", last_name="Doe", email="john@example.com", birthday=date(1990, 1, 1)),
+        OWNER,
+    )
+
+    assert (updated.first_name, updated.birthday) == ("Jack", date(1990, 1, 1))
+    assert await crud.update_contact(db_session, contact.id, ContactUpdate.model_construct(), OWNER) is updated
+    assert await crud.update_contact(db_session, contact.id + 100, ContactUpdate(
+        first_name="Jack", last_name="Doe", email="john@example.com"), OWNER) is None
+
+
+async def test_delete_contact(db_session, contact):
+    """Видалення повертає видалений контакт; чужий контакт не видаляється"""
+    assert await crud.delete_contact(db_session, contact.id, "other@example.com") is None
+
+    deleted = await crud.delete_contact(db_session, contact.id, OWNER)
+
+    assert deleted.id == contact.id
+    assert await crud.get_contact(db_session, contact.id, OWNER) is None
@@ -1,21 +1,155 @@
+from types import SimpleNamespace
+
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, patch
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db, AsyncSessionLocal
-
-@pytest.mark.asyncio
-@patch('app.database.AsyncSessionLocal')
-async def test_get_db(mock_AsyncSessionLocal):
-    # Мокування
-    mock_session = AsyncMock(AsyncSession)
-    mock_AsyncSessionLocal.return_value.__aenter__.return_value = mock_session
-
-    async for db in get_db():
-        # Перевірка, що функція повертає сесію
-        assert db == mock_session
-        # Перевірка, що контекст менеджер правильно використовує сесію
-        mock_AsyncSessionLocal.assert_called_once()
-
-    # Перевірка, що контекст менеджер правильно виконує aenter та aexit
-    mock_AsyncSessionLocal.return_value.__aenter__.assert_called_once()
-    mock_AsyncSessionLocal.return_value.__aexit__.assert_called_once()
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from app import database
+from app.auth import create_access_token
+from app.config import Settings, configure_settings
+from app.database import apply_statement_timeout, get_db, get_sessionmaker
+from app.main import create_app
+from app.models import Base, User
+from app.resources import get_redis
+from app.tests.fakes import FakeRedis
+
+
+@pytest_asyncio.fixture
+async def file_engine(tmp_path):
+    """Фікстура з рушієм застосунку на файловій SQLite"""
+    database.init_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield database.engine
+    await database.dispose_engine()
+
+
+async def count_users():
+    async with get_sessionmaker()() as session:
+        return await session.scalar(select(func.count()).select_from(User))
+
+
+async def test_get_db_commits_after_request(file_engine):
+    """Зміни фіксуються, коли обробник завершився успішно"""
+    dependency = get_db()
+    session = await anext(dependency)
+    session.add(User(email="user@example.com", hashed_password="hashed"))
+    await session.flush()
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(dependency)
+    assert await count_users() == 1
+
+
+async def test_get_db_rolls_back_on_error(file_engine):
+    """Виняток обробника відкочує всі зміни запиту"""
+    dependency = get_db()
+    session = await anext(dependency)
+    session.add(User(email="user@example.com", hashed_password="hashed"))
+    await session.flush()
+
+    with pytest.raises(RuntimeError):
+        await dependency.athrow(RuntimeError("handler failed"))
+    assert await count_users() == 0
+
+
+@pytest.fixture
+def file_client(tmp_path):
+    """Фікстура з клієнтом застосунку, що працює з реальним get_db на файловій SQLite"""
+    app = create_app(Settings(database_url=f"sqlite+aiosqlite:///{tmp_path / 'app.db'}", db_echo=False))
+    app.dependency_overrides[get_redis] = FakeRedis
+
+    async def create_tables():
+        get_sessionmaker()
+        async with database.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        with TestClient(app) as test_client:
+            test_client.portal.call(create_tables)
+            yield test_client
+    finally:
+        configure_settings(None)
+
+
+def count_statements(client, request):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(database.engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = request()
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", listener)
+    return response, statements
+
+
+def test_write_request_uses_single_statement(file_client):
+    """Створення контакту виконує один INSERT ... RETURNING без повторного SELECT"""
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'owner@example.com'})}"}
+    payload = {"first_name": "John", "last_name": "Doe", "email": "john@example.com"}
+
+    response, statements = count_statements(
+        file_client, lambda: file_client.post("/contacts", json=payload, headers=headers))
+    assert response.status_code == 201
+    assert response.json()["id"] == 1
+    assert len(statements) == 1 and "RETURNING" in statements[0]
+
+    contacts = [dict(payload, email=f"john{i}@example.com") for i in range(3)]
+    response, statements = count_statements(
+        file_client, lambda: file_client.post("/contacts/import", json=contacts, headers=headers))
+    assert response.json() == {"imported": 3, "ids": [2, 3, 4]}
+    # SQLite не дає зіставити рядки RETURNING пакетного INSERT з параметрами, тож
+    # SQLAlchemy вставляє по рядку; на PostgreSQL це один INSERT ... SELECT ... ORDER BY
+    assert statements and all(statement.startswith("INSERT") and "RETURNING" in statement for statement in statements)
+
+    # Зміни зафіксовано: інший запит бачить усі контакти
+    assert len(file_client.get("/contacts", headers=headers).json()) == 4
+
+
+def test_failed_request_is_rolled_back(file_client):
+    """Помилка обробника відкочує всю транзакцію запиту"""
+    with patch("app.main.send_verification_email", AsyncMock()):
+        assert file_client.post("/register", json={"email": "user@example.com", "password": "secret"}).status_code == 200
+    with patch("app.main.send_verification_email", AsyncMock(side_effect=RuntimeError("SMTP is down"))):
+        with pytest.raises(RuntimeError):
+            file_client.post("/register", json={"email": "other@example.com", "password": "secret"})
+    with patch("app.main.send_verification_email", AsyncMock()):
+        response = file_client.post("/register", json={"email": "user@example.com", "password": "secret"})
+    assert response.status_code == 409
+
+    async def emails():
+        async with get_sessionmaker()() as session:
+            return (await session.scalars(select(User.email))).all()
+
+    assert file_client.portal.call(emails) == ["user@example.com"]
+
+
+def test_apply_statement_timeout():
+    """statement_timeout класу маршруту встановлюється SET LOCAL лише на PostgreSQL"""
+    statements = []
+
+    postgresql = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), exec_driver_sql=statements.append)
+    sqlite = SimpleNamespace(dialect=SimpleNamespace(name="sqlite"), exec_driver_sql=statements.append)
+
+    apply_statement_timeout(postgresql, 30.0)
+    apply_statement_timeout(postgresql, None)
+    apply_statement_timeout(sqlite, 30.0)
+
+    assert statements == ["SET LOCAL statement_timeout = 30000"]
+
+
+async def test_statement_timeout_is_applied_when_session_uses_database(file_engine, monkeypatch):
+    """statement_timeout встановлюється лише тоді, коли сесія бере підключення"""
+    applied = []
+    monkeypatch.setattr(database, "apply_statement_timeout", lambda connection, timeout: applied.append(timeout))
+    token = database.route_statement_timeout.set(30.0)
+    try:
+        async for session in get_db():
+            assert applied == []
+            await session.scalar(select(func.count()).select_from(User))
+            await session.scalar(select(func.count()).select_from(User))
+    finally:
+        database.route_statement_timeout.reset(token)
+
+    assert applied == [30.0]
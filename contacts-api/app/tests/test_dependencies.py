@@ -1,73 +1,41 @@
-import pytest
-from unittest.mock import AsyncMock, patch
-from fastapi_mail import FastMail, MessageSchema
-from cloudinary.uploader import upload
-from cloudinary.utils import cloudinary_url
+from datetime import date
+from io import BytesIO
 
-from app.email import send_verification_email, upload_avatar, send_reset_email
+from app.dependencies import send_birthday_digest, send_reset_email, send_verification_email, upload_avatar
 
-@pytest.mark.asyncio
-@patch('app.email.FastMail')
-@patch('app.email.MessageSchema')
-async def test_send_verification_email(mock_MessageSchema, mock_FastMail):
-    # Мокування
-    mock_fm_instance = AsyncMock()
-    mock_FastMail.return_value = mock_fm_instance
 
-    email = 'test@example.com'
-    token = 'fake_token'
+async def test_send_verification_email(smtp):
+    """Лист верифікації містить посилання з токеном"""
+    await send_verification_email("test@example.com", "fake_token")
 
-    # Визначення результатів моків
-    mock_MessageSchema.return_value = mock_MessageSchema(
-        subject="Email Verification",
-        recipients=[email],
-        body=f"To verify your email, click the following link: http://your-app-url.com/verify-email?token={token}",
-        subtype="html"
-    )
+    sender, recipients, body = smtp.messages[0]
+    assert (sender, recipients) == ("noreply@example.com", ["test@example.com"])
+    assert "verify-email?token=fake_token" in body
 
-    await send_verification_email(email, token)
 
-    # Перевірка, чи був викликаний метод send_message
-    mock_fm_instance.send_message.assert_called_once_with(mock_MessageSchema.return_value)
+async def test_send_reset_email(smtp):
+    """Лист скидання паролю містить посилання з токеном"""
+    await send_reset_email("test@example.com", "fake_token")
 
-@pytest.mark.asyncio
-@patch('app.email.upload')
-@patch('app.email.cloudinary_url')
-async def test_upload_avatar(mock_cloudinary_url, mock_upload):
-    # Мокування
-    mock_upload.return_value = {'public_id': 'fake_id'}
-    mock_cloudinary_url.return_value = ('http://res.cloudinary.com/your-cloud-name/image/upload/fake_id.jpg', {})
+    assert "reset-password?token=fake_token" in smtp.messages[0][2]
 
-    file = AsyncMock()
-    file.file = 'path/to/file'
 
-    avatar_url = await upload_avatar(file)
+async def test_send_birthday_digest(smtp):
+    """Дайджест перелічує контакти з датами, екрануючи HTML"""
+    await send_birthday_digest("test@example.com", [("Ann <Lee>", date(2024, 3, 11))])
 
-    # Перевірка результатів
-    mock_upload.assert_called_once_with('path/to/file')
-    mock_cloudinary_url.assert_called_once_with('fake_id', format="jpg")
-    assert avatar_url == 'http://res.cloudinary.com/your-cloud-name/image/upload/fake_id.jpg'
+    assert "Ann &lt;Lee&gt; — 11.03" in smtp.messages[0][2]
 
-@pytest.mark.asyncio
-@patch('app.email.FastMail')
-@patch('app.email.MessageSchema')
-async def test_send_reset_email(mock_MessageSchema, mock_FastMail):
-    # Мокування
-    mock_fm_instance = AsyncMock()
-    mock_FastMail.return_value = mock_fm_instance
 
-    email = 'test@example.com'
-    token = 'fake_token'
+class Upload:
+    def __init__(self, data: bytes):
+        self.file = BytesIO(data)
 
-    # Визначення результатів моків
-    mock_MessageSchema.return_value = mock_MessageSchema(
-        subject="Password Reset Request",
-        recipients=[email],
-        body=f"To reset your password, click the following link: http://your-app-url.com/reset-password?token={token}",
-        subtype="html"
-    )
 
-    await send_reset_email(email, token)
+async def test_upload_avatar(storage):
+    """Аватар завантажується у сховище, URL вказує на JPG-версію"""
+    avatar_url = await upload_avatar(Upload(b"avatar data"))
 
-    # Перевірка, чи був викликаний метод send_message
-    mock_fm_instance.send_message.assert_called_once_with(mock_MessageSchema.return_value)
+    assert storage == [b"avatar data"]
+    assert avatar_url.startswith("http://res.cloudinary.com/demo/image/upload/")
+    assert avatar_url.endswith("avatar1.jpg")
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.idempotency import REPLAYED_HEADER, fingerprint, idempotent
+from app.tests.fakes import FakeRedis
+
+
+@pytest.mark.asyncio
+async def test_replay_does_not_call_handler():
+    """Повторний запит з тим самим ключем повертає збережену відповідь"""
+    redis = FakeRedis()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return {"id": len(calls)}
+
+    first = await idempotent(redis, "user@example.com", "key-1", fingerprint({"a": 1}), handler)
+    second = await idempotent(redis, "user@example.com", "key-1", fingerprint({"a": 1}), handler)
+
+    assert len(calls) == 1
+    assert first.body == second.body
+    assert second.headers[REPLAYED_HEADER] == "true"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_run_once():
+    """Одночасні дублікати чекають на перший запит замість повторного виконання"""
+    redis = FakeRedis()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"ok": True}
+
+    responses = await asyncio.gather(*(
+        idempotent(redis, "user@example.com", "key-1", fingerprint({}), handler) for _ in range(10)
+    ))
+
+    assert len(calls) == 1
+    assert {response.body for response in responses} == {b'{"ok":true}'}
+
+
+@pytest.mark.asyncio
+async def test_key_reuse_with_different_payload_is_rejected():
+    """Ключ не можна використати повторно з іншим тілом запиту"""
+    redis = FakeRedis()
+
+    async def handler():
+        return {}
+
+    await idempotent(redis, "user@example.com", "key-1", fingerprint({"a": 1}), handler)
+    with pytest.raises(HTTPException) as error:
+        await idempotent(redis, "user@example.com", "key-1", fingerprint({"a": 2}), handler)
+    assert error.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_not_stored():
+    """Після помилки блокування знімається і запит виконується знову"""
+    redis = FakeRedis()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise HTTPException(status_code=409)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await idempotent(redis, "user@example.com", "key-1", fingerprint({}), failing)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_response_is_stored_after_commit():
+    """Відповідь зберігається лише після фіксації; якщо вона не вдалася, повтор виконує запит знову"""
+    redis = FakeRedis()
+    response_key = "idempotency:user@example.com:key-1"
+    calls, commits = [], []
+
+    async def handler():
+        calls.append(1)
+        return {"id": 1}
+
+    async def failing_commit():
+        assert await redis.get(response_key) is None
+        raise RuntimeError("could not serialize access")
+
+    async def commit():
+        assert await redis.get(f"{response_key}:lock") is not None
+        commits.append(1)
+
+    with pytest.raises(RuntimeError):
+        await idempotent(redis, "user@example.com", "key-1", fingerprint({}), handler, commit=failing_commit)
+    assert await redis.get(response_key) is None
+    assert await redis.get(f"{response_key}:lock") is None
+
+    response = await idempotent(redis, "user@example.com", "key-1", fingerprint({}), handler, commit=commit)
+    assert response.status_code == 200
+    assert calls == [1, 1] and commits == [1]
+    replay = await idempotent(redis, "user@example.com", "key-1", fingerprint({}), handler, commit=commit)
+    assert replay.headers[REPLAYED_HEADER] == "true"
+
+
+async def test_import_contacts_replay_skips_database(client, auth_headers, statements):
+    """Повтор масового імпорту не створює дублікатів і не звертається до бази"""
+    headers = {**auth_headers, "Idempotency-Key": "import-1"}
+    payload = [{"first_name": "John", "last_name": "Doe", "email": "john@example.com"}]
+
+    first = await client.post("/contacts/import", json=payload, headers=headers)
+    executed = len(statements)
+    second = await client.post("/contacts/import", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert first.json() == second.json()
+    assert first.json()["imported"] == 1
+    assert second.headers[REPLAYED_HEADER] == "true"
+    assert len(statements) == executed
+    assert len((await client.get("/contacts", headers=auth_headers)).json()) == 1
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app import crud
+from app.loaders import ContactLoader
+from app.models import Contact
+
+
+@pytest_asyncio.fixture
+async def contact_ids(db_session):
+    """Фікстура з контактами двох власників: два контакти owner@example.com і один other@example.com"""
+    contacts = [
+        Contact(first_name="John", last_name="Doe", email="john@example.com", user_email="owner@example.com"),
+        Contact(first_name="Jane", last_name="Doe", email="jane@example.com", user_email="owner@example.com"),
+        Contact(first_name="Eve", last_name="Smith", email="eve@example.com", user_email="other@example.com"),
+    ]
+    db_session.add_all(contacts)
+    await db_session.commit()
+    return [contact.id for contact in contacts]
+
+
+@pytest.mark.asyncio
+async def test_loader_batches_ids_within_a_tick():
+    """Id, запитані в одному проході циклу подій, завантажуються одним викликом"""
+    batches = []
+
+    async def batch_load(db, user_email, contact_ids):
+        batches.append(list(contact_ids))
+        return [Contact(id=contact_id) for contact_id in contact_ids if contact_id != 3]
+
+    loader = ContactLoader(None, "owner@example.com", batch_load=batch_load)
+    first, second, missing, again = await asyncio.gather(
+        loader.load(2), loader.load(1), loader.load(3), loader.load(2),
+    )
+
+    assert batches == [[2, 1, 3]]
+    assert (first.id, second.id, missing, again) == (2, 1, None, first)
+    assert (await loader.load(1)).id == 1
+    assert batches == [[2, 1, 3]]
+
+
+@pytest.mark.asyncio
+async def test_get_contacts_by_ids_is_scoped_to_owner(db_session, contact_ids):
+    """Контакти іншого власника не повертаються"""
+    contacts = await crud.get_contacts_by_ids(db_session, "owner@example.com", contact_ids)
+    assert sorted(contact.id for contact in contacts) == sorted(contact_ids[:2])
+
+
+@pytest.mark.asyncio
+async def test_read_contacts_by_ids_uses_one_query(client, auth_headers, contact_ids, statements):
+    """GET /contacts/batch зберігає порядок, повідомляє про відсутні id і виконує один SELECT"""
+    first, second, foreign = contact_ids
+    unknown = max(contact_ids) + 100
+    statements.clear()
+
+    response = await client.get("/contacts/batch", params={"ids": f"{second},{foreign},{unknown},{first}"},
+                                headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [contact["id"] for contact in response.json()["contacts"]] == [second, first]
+    assert response.json()["missing"] == [foreign, unknown]
+    assert len([statement for statement in statements if statement.startswith("SELECT")]) == 1
@@ -0,0 +1,136 @@
+import io
+import json
+import logging
+import sys
+
+from sqlalchemy import text
+
+from app import database
+from app.log import JsonFormatter, SamplingFilter, request_id, sample_draw, setup_logging, stop_logging
+
+
+def make_record(name="app", level=logging.INFO):
+    return logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level)})
+
+
+def test_json_formatter():
+    """Запис форматується як JSON з id запиту, полями extra і traceback"""
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("app").makeRecord("app", logging.ERROR, __file__, 1, "failed %s", ("job",),
+                                                     sys.exc_info(), extra={"status": 500})
+    record.request_id = "abc"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert (entry["level"], entry["message"], entry["request_id"], entry["status"]) == ("ERROR", "failed job", "abc", 500)
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_sampling_filter():
+    """Вибірка стосується DEBUG і INFO галасливих логерів і стабільна в межах запиту"""
+    never, always = SamplingFilter(0.0), SamplingFilter(1.0)
+    half = SamplingFilter(0.5)
+
+    assert never.filter(make_record(level=logging.WARNING))
+    assert never.filter(make_record(name="app.access"))
+    assert not never.filter(make_record(name="sqlalchemy.engine.Engine"))
+    assert not never.filter(make_record(level=logging.DEBUG))
+    assert always.filter(make_record(level=logging.DEBUG))
+
+    decisions = set()
+    for draw in (0.1, 0.9):
+        token = sample_draw.set(draw)
+        try:
+            decision = half.filter(make_record(level=logging.DEBUG))
+            assert half.filter(make_record(name="app.cache", level=logging.DEBUG)) is decision
+            decisions.add(decision)
+        finally:
+            sample_draw.reset(token)
+    assert decisions == {True, False}
+
+
+def test_setup_logging_accepts_lowercase_level():
+    """Рівень приймається в нижньому регістрі, як LOG_LEVEL для uvicorn"""
+    root = logging.getLogger()
+    previous = root.level
+    listener = setup_logging("warning", stream=io.StringIO())
+    try:
+        assert root.level == logging.WARNING
+    finally:
+        stop_logging(listener)
+        root.setLevel(previous)
+
+
+async def test_request_id_reaches_access_and_cache_logs(client, auth_headers):
+    """Id запиту повертається клієнту і потрапляє в журнал доступу і записи кешу"""
+    stream = io.StringIO()
+    listener = setup_logging("DEBUG", sample_rate=1.0, stream=stream)
+    try:
+        created = await client.post("/contacts", json={"first_name": "John", "last_name": "Doe",
+                                                      "email": "john@example.com"}, headers=auth_headers)
+        response = await client.get(f"/contacts/{created.json()['id']}",
+                                    headers={**auth_headers, "X-Request-ID": "req-42"})
+        generated = created.headers["X-Request-ID"]
+    finally:
+        stop_logging(listener)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    traced = [entry for entry in entries if entry.get("request_id") == "req-42"]
+    assert response.headers["X-Request-ID"] == "req-42"
+    assert len(generated) == 32 and generated != "req-42"
+    assert {"app.access", "app.cache"} <= {entry["logger"] for entry in traced}
+    access = next(entry for entry in traced if entry["logger"] == "app.access")
+    assert (access["method"], access["status"]) == ("GET", 200)
+
+
+async def test_client_request_id_does_not_force_sampling(client, auth_headers, monkeypatch):
+    """Вибірка не залежить від X-Request-ID клієнта: той самий id не вмикає логування кожного запиту"""
+    created = await client.post("/contacts", json={"first_name": "John", "last_name": "Doe",
+                                                  "email": "john@example.com"}, headers=auth_headers)
+    monkeypatch.setattr("app.log.random.random", lambda: 0.5)
+    stream = io.StringIO()
+    listener = setup_logging("DEBUG", sample_rate=0.01, stream=stream)
+    try:
+        for _ in range(5):
+            await client.get(f"/contacts/{created.json()['id']}", headers={**auth_headers, "X-Request-ID": "req-17"})
+    finally:
+        stop_logging(listener)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry["request_id"] for entry in entries if entry["logger"] == "app.access"] == ["req-17"] * 5
+    assert not [entry for entry in entries if entry["logger"] == "app.cache"]
+
+
+async def test_request_id_reaches_sql_logs(tmp_path):
+    """SQL-записи рушія з db_echo містять id запиту, у межах якого виконано запит"""
+    stream = io.StringIO()
+    listener = setup_logging("INFO", sample_rate=1.0, stream=stream)
+    sql_logger = logging.getLogger("sqlalchemy.engine")
+    sql_level = sql_logger.level
+    database.init_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}", echo=True)
+    token = request_id.set("req-sql")
+    try:
+        async with database.get_sessionmaker()() as session:
+            await session.execute(text("SELECT 1"))
+    finally:
+        request_id.reset(token)
+        await database.dispose_engine()
+        stop_logging(listener)
+        sql_logger.setLevel(sql_level)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    statements = [entry for entry in entries if entry["message"] == "SELECT 1"]
+    assert [entry["request_id"] for entry in statements] == ["req-sql"]
+
+
+async def test_invalid_request_id_is_replaced(client):
+    """Небезпечний id клієнта замінюється згенерованим"""
+    response = await client.get("/healthz", headers={"X-Request-ID": "bad id\r\n"})
+
+    assert response.headers["X-Request-ID"] != "bad id"
+    assert len(response.headers["X-Request-ID"]) == 32
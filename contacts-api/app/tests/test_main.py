@@ -1,99 +1,174 @@
-import unittest
-from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from main import app, get_db, create_access_token, SECRET_KEY
-from models import Base, User
-from schemas import UserCreate
-import jwt
-import datetime
-
-# Налаштування для тестування
-DATABASE_URL = "sqlite+aiosqlite:///./test.db"
-engine = create_async_engine(DATABASE_URL, echo=True)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
-
-# Ініціалізація клієнта FastAPI
-client = TestClient(app)
-
-# Фікстури для тестування
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-class TestMain(unittest.TestCase):
-
-    @classmethod
-    async def setUpClass(cls):
-        """Ініціалізація перед запуском всіх тестів"""
-        async with engine.begin() as conn:
-            # Створюємо таблиці в базі даних
-            await conn.run_sync(Base.metadata.create_all)
-
-    async def setUp(self):
-        """Ініціалізація перед кожним тестом"""
-        async with TestingSessionLocal() as db:
-            # Очищаємо базу даних
-            await db.execute("DELETE FROM user")
-            await db.commit()
-
-    async def test_register_user(self):
-        """Тестування реєстрації користувача"""
-        response = client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("msg", response.json())
-        self.assertEqual(response.json()["msg"], "User created. Please verify your email.")
-
-    async def test_login_user(self):
-        """Тестування авторизації користувача"""
-        # Спочатку реєструємо користувача
-        client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
-        # Потім авторизуємося
-        response = client.post("/token", data={"username": "test@example.com", "password": "testpassword"})
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("access_token", response.json())
-        self.assertIn("refresh_token", response.json())
-
-    async def test_password_reset_request(self):
-        """Тестування запиту на скидання паролю"""
-        client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
-        response = client.post("/password/reset/request", json={"email": "test@example.com"})
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("msg", response.json())
-        self.assertEqual(response.json()["msg"], "Password reset email sent")
-
-    async def test_reset_password(self):
-        """Тестування скидання паролю"""
-        client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
-        reset_token = create_access_token({"sub": "test@example.com"}, expires_delta=datetime.timedelta(minutes=15))
-        response = client.post("/reset-password", json={"email": "test@example.com"})
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("msg", response.json())
-        self.assertEqual(response.json()["msg"], "Password reset link sent to your email.")
-
-    async def test_update_avatar(self):
-        """Тестування оновлення аватара"""
-        client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
-        login_response = client.post("/token", data={"username": "test@example.com", "password": "testpassword"})
-        access_token = login_response.json()["access_token"]
-        with open("test_avatar.png", "wb") as f:
-            f.write(b"dummy avatar data")
-        with open("test_avatar.png", "rb") as f:
-            response = client.post("/users/me/avatar", files={"file": ("test_avatar.png", f, "image/png")}, headers={"Authorization": f"Bearer {access_token}"})
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("avatar_url", response.json())
-
-    @classmethod
-    async def tearDownClass(cls):
-        """Очищення після запуску всіх тестів"""
-        async with engine.begin() as conn:
-            # Видаляємо таблиці з бази даних
-            await conn.run_sync(Base.metadata.drop_all)
-
-if __name__ == "__main__":
-    unittest.main()
+from sqlalchemy import select
+
+from app.auth import create_access_token, verify_password
+from app.main import MAX_IDS
+from app.models import Contact, User
+
+CONTACT = {"first_name": "John", "last_name": "Doe", "email": "john@example.com", "birthday": "1990-01-01"}
+
+
+async def test_healthz(client):
+    """Перевірка готовності не потребує авторизації"""
+    response = await client.get("/healthz")
+
+    assert response.json() == {"status": "ok"}
+
+
+async def test_register_user(client, db_session, smtp):
+    """Реєстрація зберігає хеш пароля і надсилає лист для верифікації"""
+    response = await client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
+
+    assert response.status_code == 200
+    assert response.json()["msg"] == "User created. Please verify your email."
+    user = await db_session.scalar(select(User).where(User.email == "test@example.com"))
+    assert verify_password("testpassword", user.hashed_password)
+    assert [recipients for _, recipients, _ in smtp.messages] == [["test@example.com"]]
+    assert "verify-email?token=" in smtp.messages[0][2]
+
+
+async def test_register_duplicate_email(client, smtp):
+    """Повторна реєстрація з тим самим email повертає 409"""
+    await client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
+    response = await client.post("/register", json={"email": "test@example.com", "password": "other"})
+
+    assert response.status_code == 409
+    assert len(smtp.messages) == 1
+
+
+async def test_password_reset_request(client, smtp):
+    """Запит на скидання паролю надсилає лист у фоновому завданні"""
+    await client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
+    response = await client.post("/password/reset/request", params={"email": "test@example.com"})
+    unknown = await client.post("/password/reset/request", params={"email": "nobody@example.com"})
+
+    assert response.json() == {"msg": "Password reset email sent"}
+    assert unknown.status_code == 404
+    assert "reset-password?token=" in smtp.messages[-1][2]
+
+
+async def test_reset_password(client, smtp):
+    """Скидання паролю надсилає посилання на пошту користувача"""
+    await client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
+    response = await client.post("/reset-password", params={"email": "test@example.com"})
+
+    assert response.json() == {"msg": "Password reset link sent to your email."}
+    assert smtp.messages[-1][1] == ["test@example.com"]
+
+
+async def test_update_avatar(client, db_session, smtp, storage):
+    """Аватар завантажується у сховище, а його URL зберігається в профілі"""
+    await client.post("/register", json={"email": "test@example.com", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'test@example.com'})}"}
+
+    response = await client.post("/users/me/avatar", files={"file": ("avatar.png", b"avatar data", "image/png")},
+                                 headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["avatar_url"].endswith("/avatar1.jpg")
+    assert storage == [b"avatar data"]
+    user = await db_session.scalar(select(User).where(User.email == "test@example.com"))
+    assert user.avatar_url == response.json()["avatar_url"]
+
+
+async def test_create_and_read_contacts(client, auth_headers):
+    """Створений контакт доступний у списку, за id і в пакетному запиті"""
+    created = await client.post("/contacts", json=CONTACT, headers=auth_headers)
+    contact_id = created.json()["id"]
+
+    assert created.status_code == 201
+    assert (await client.get(f"/contacts/{contact_id}", headers=auth_headers)).json()["email"] == CONTACT["email"]
+    assert [contact["id"] for contact in (await client.get("/contacts", headers=auth_headers)).json()] == [contact_id]
+    batch = await client.get("/contacts/batch", params={"ids": f"{contact_id},999"}, headers=auth_headers)
+    assert batch.json() == {"contacts": [dict(CONTACT, id=contact_id, phone=None, additional_data=None)],
+                            "missing": [999]}
+    assert (await client.get("/contacts/batch", headers=auth_headers)).status_code == 422
+
+
+async def test_read_contacts_by_too_many_ids(client, auth_headers):
+    """Пакетний запит приймає не більше MAX_IDS id"""
+    at_limit = await client.get("/contacts/batch", params={"ids": ",".join(map(str, range(1, MAX_IDS + 1)))},
+                                headers=auth_headers)
+    over_limit = await client.get("/contacts/batch", params={"ids": ",".join(map(str, range(1, MAX_IDS + 2)))},
+                                  headers=auth_headers)
+
+    assert at_limit.status_code == 200
+    assert len(at_limit.json()["missing"]) == MAX_IDS
+    assert over_limit.status_code == 422
+
+
+async def test_contact_created_after_not_found(client, auth_headers):
+    """Відповідь 404 не кешується: контакт, створений після неї, одразу доступний"""
+    first_id = (await client.post("/contacts", json=CONTACT, headers=auth_headers)).json()["id"]
+    assert (await client.get(f"/contacts/{first_id + 1}", headers=auth_headers)).status_code == 404
+
+    created = await client.post("/contacts", json=dict(CONTACT, email="jane@example.com"), headers=auth_headers)
+    assert created.json()["id"] == first_id + 1
+
+    response = await client.get(f"/contacts/{first_id + 1}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "jane@example.com"
+
+
+async def test_contacts_are_private(client, db_session, auth_headers):
+    """Контакти іншого власника не видно"""
+    db_session.add(Contact(first_name="Eve", last_name="Smith", email="eve@example.com", user_email="other@example.com"))
+    await db_session.commit()
+    contact_id = (await db_session.scalar(select(Contact.id).where(Contact.email == "eve@example.com")))
+
+    assert (await client.get(f"/contacts/{contact_id}", headers=auth_headers)).status_code == 404
+    assert (await client.get("/contacts", headers=auth_headers)).json() == []
+
+
+async def test_import_contacts(client, auth_headers):
+    """Масовий імпорт повертає id у порядку вхідних контактів"""
+    contacts = [dict(CONTACT, email=f"john{i}@example.com") for i in range(3)]
+
+    response = await client.post("/contacts/import", json=contacts, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 3
+    listed = (await client.get("/contacts", headers=auth_headers)).json()
+    assert {contact["id"]: contact["email"] for contact in listed} == dict(zip(response.json()["ids"],
+                                                                               [c["email"] for c in contacts]))
+
+
+async def test_contacts_pages_by_cursor(client, auth_headers):
+    """Список контактів обходиться сторінками за курсором із заголовка X-Next-Cursor"""
+    contacts = [dict(CONTACT, last_name=f"Doe{i}", email=f"john{i}@example.com") for i in range(5)]
+    await client.post("/contacts/import", json=contacts, headers=auth_headers)
+
+    listed, params = [], {"limit": 2}
+    while True:
+        response = await client.get("/contacts", params=params, headers=auth_headers)
+        listed += [contact["last_name"] for contact in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert listed == [f"Doe{i}" for i in range(5)]
+    invalid = await client.get("/contacts", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert invalid.status_code == 422
+
+
+async def test_tags(client, auth_headers):
+    """Мітки створюються, масово призначаються контактам і фільтрують список"""
+    ids = (await client.post("/contacts/import", json=[dict(CONTACT, email=f"john{i}@example.com") for i in range(3)],
+                             headers=auth_headers)).json()["ids"]
+    for name in ("work", "family"):
+        assert (await client.post("/tags", json={"name": name}, headers=auth_headers)).status_code == 201
+    assert (await client.post("/tags", json={"name": "work"}, headers=auth_headers)).status_code == 409
+
+    assigned = await client.post("/contacts/tags", json={"tags": ["work", "family"], "contact_ids": ids[:2]},
+                                 headers=auth_headers)
+    assert assigned.json() == {"assigned": 4}
+    removed = await client.request("DELETE", "/contacts/tags", json={"tags": ["family"], "contact_ids": ids[:1]},
+                                   headers=auth_headers)
+    assert removed.json() == {"removed": 1}
+
+    tags = (await client.get("/tags", headers=auth_headers)).json()
+    assert [(tag["name"], tag["contacts"]) for tag in tags] == [("family", 1), ("work", 2)]
+    filtered = await client.get("/contacts", params={"tags": "work,family", "match": "all"}, headers=auth_headers)
+    assert [contact["id"] for contact in filtered.json()] == [ids[1]]
+
+    assert (await client.delete("/tags/work", headers=auth_headers)).status_code == 204
+    assert (await client.delete("/tags/work", headers=auth_headers)).status_code == 404
@@ -0,0 +1,191 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.environment import EnvironmentContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.exc import DBAPIError
+
+from migrations.dry_run import OFFLINE_URL, analyze, blocking_existing_tables, split_statements
+from migrations import helpers
+from migrations.helpers import backfill_in_batches, create_index, estimate_lock_impact, execute_with_lock_timeout
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(os.path.join(PROJECT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_upgrade_and_downgrade(tmp_path):
+    """Міграції створюють схему моделей і повністю відкочуються"""
+    database = tmp_path / "migrations.db"
+    config = alembic_config(f"sqlite+aiosqlite:///{database}")
+
+    command.upgrade(config, "head")
+    engine = sa.create_engine(f"sqlite:///{database}")
+    try:
+        with engine.connect() as conn:
+            inspector = sa.inspect(conn)
+            assert {"users", "contacts", "tags", "contact_tags"} <= set(inspector.get_table_names())
+            assert "ix_contacts_owner_name" in {index["name"] for index in inspector.get_indexes("contacts")}
+
+        command.downgrade(config, "base")
+        with engine.connect() as conn:
+            assert set(sa.inspect(conn).get_table_names()) == {"alembic_version"}
+    finally:
+        engine.dispose()
+
+
+def test_contact_names_become_not_null(tmp_path):
+    """Порожні імена контактів заповнюються, після чого колонки стають NOT NULL"""
+    database = tmp_path / "migrations.db"
+    config = alembic_config(f"sqlite+aiosqlite:///{database}")
+    command.upgrade(config, "0004")
+    engine = sa.create_engine(f"sqlite:///{database}")
+    try:
+        with engine.begin() as conn:
+            conn.execute(sa.text("INSERT INTO users (email, hashed_password) VALUES ('owner@example.com', '-')"))
+            conn.execute(sa.text("INSERT INTO contacts (first_name, last_name, email, user_email) "
+                                 "VALUES ('John', NULL, 'john@example.com', 'owner@example.com')"))
+
+        command.upgrade(config, "0005")
+        with engine.connect() as conn:
+            columns = {column["name"]: column for column in sa.inspect(conn).get_columns("contacts")}
+            assert not columns["first_name"]["nullable"] and not columns["last_name"]["nullable"]
+            assert conn.execute(sa.text("SELECT first_name, last_name FROM contacts")).one() == ("John", "")
+            assert "ix_contacts_owner_name" in {index["name"] for index in sa.inspect(conn).get_indexes("contacts")}
+    finally:
+        engine.dispose()
+
+
+def test_set_not_null_validates_without_blocking_writes():
+    """На PostgreSQL NOT NULL спирається на CHECK ... NOT VALID, перевірений без блокування запису"""
+    impacts = [impact for impact in analyze("0004:0005", ["partitions=2"]) if impact.table == "contacts_p0"]
+    statements = [impact.statement.split(" ck_")[0] for impact in impacts]
+
+    assert statements.index("ALTER TABLE contacts_p0 VALIDATE CONSTRAINT") < statements.index(
+        "ALTER TABLE contacts_p0 ALTER COLUMN last_name SET NOT NULL")
+    assert all(not impact.blocks_writes for impact in impacts if "VALIDATE" in impact.statement)
+    added = next(impact for impact in impacts if "ADD CONSTRAINT" in impact.statement)
+    assert (added.lock, added.blocks_reads, added.note) == ("ACCESS EXCLUSIVE", True, "brief, no scan")
+
+
+def test_backfill_in_batches():
+    """Заповнення колонки виконується пакетами за зростанням ключа і зачіпає лише рядки з NULL"""
+    engine = sa.create_engine("sqlite://")
+    config = alembic_config("sqlite://")
+    starts = []
+
+    @sa.event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            starts.append(parameters[0] if parameters else None)
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(sa.text("CREATE TABLE items (id INTEGER PRIMARY KEY, flag INTEGER)"))
+            conn.execute(sa.text("INSERT INTO items (id, flag) VALUES (:id, :flag)"),
+                         [{"id": i, "flag": 0 if i == 1 else None} for i in range(1, 26)])
+
+            with EnvironmentContext(config, ScriptDirectory.from_config(config)) as environment:
+                environment.configure(connection=conn)
+                with Operations.context(environment.get_context()):
+                    updated = backfill_in_batches("items", "flag", "1", batch_size=10)
+
+            assert updated == 24
+            assert conn.execute(sa.text("SELECT count(*) FROM items WHERE flag = 1")).scalar() == 24
+            assert starts == [None, 11, 21]
+    finally:
+        engine.dispose()
+
+
+def test_execute_with_lock_timeout_retries(monkeypatch):
+    """Інструкція, що не дочекалася блокування, повторюється з lock_timeout; інші помилки не повторюються"""
+    executed = []
+    failures = {"ALTER TABLE contacts ALTER COLUMN last_name SET NOT NULL": 2, "ALTER TABLE broken": 1}
+
+    def execute(statement):
+        executed.append(statement)
+        if failures.get(statement):
+            failures[statement] -= 1
+            sqlstate = "55P03" if statement.endswith("NOT NULL") else "42P01"
+            raise DBAPIError(statement, {}, SimpleNamespace(sqlstate=sqlstate))
+
+    monkeypatch.setattr(helpers, "op", SimpleNamespace(execute=execute))
+    monkeypatch.setattr(helpers.time, "sleep", lambda seconds: None)
+
+    execute_with_lock_timeout("ALTER TABLE contacts ALTER COLUMN last_name SET NOT NULL")
+    with pytest.raises(DBAPIError):
+        execute_with_lock_timeout("ALTER TABLE broken")
+
+    assert executed == ["SET lock_timeout = '2s'"] + ["ALTER TABLE contacts ALTER COLUMN last_name SET NOT NULL"] * 3 + [
+        "RESET lock_timeout", "SET lock_timeout = '2s'", "ALTER TABLE broken", "RESET lock_timeout"]
+
+
+@pytest.mark.parametrize("state, expected", [
+    (None, ["CREATE INDEX CONCURRENTLY ix_items_flag"]),
+    (False, ["DROP INDEX CONCURRENTLY ix_items_flag", "CREATE INDEX CONCURRENTLY ix_items_flag"]),
+    (True, []),
+])
+def test_create_index_keeps_valid_index(monkeypatch, state, expected):
+    """На PostgreSQL видаляється лише невалідний індекс, а валідний не перебудовується"""
+    monkeypatch.setattr(helpers, "index_state", lambda name: state)
+    config = alembic_config(OFFLINE_URL)
+    buffer = io.StringIO()
+    with EnvironmentContext(config, ScriptDirectory.from_config(config)) as environment:
+        environment.configure(url=OFFLINE_URL, as_sql=True, output_buffer=buffer)
+        with Operations.context(environment.get_context()):
+            create_index("ix_items_flag", "items", ["flag"])
+
+    statements = [statement.split(" ON ")[0] for statement in split_statements(buffer.getvalue())]
+    assert [statement for statement in statements if "INDEX" in statement] == expected
+
+
+@pytest.mark.parametrize("statement, lock, blocks_writes", [
+    ("CREATE INDEX CONCURRENTLY ix ON contacts (email)", "SHARE UPDATE EXCLUSIVE", False),
+    ("CREATE INDEX ix ON contacts (email)", "SHARE", True),
+    ("ALTER TABLE contacts ADD COLUMN note VARCHAR", "ACCESS EXCLUSIVE", True),
+    ("ALTER TABLE contacts ALTER COLUMN phone SET NOT NULL", "ACCESS EXCLUSIVE", True),
+    ("ALTER TABLE contacts ADD CONSTRAINT ck CHECK (phone IS NOT NULL) NOT VALID", "ACCESS EXCLUSIVE", True),
+    ("ALTER TABLE contacts ADD CONSTRAINT fk FOREIGN KEY (user_email) REFERENCES users (email) NOT VALID",
+     "SHARE ROW EXCLUSIVE", True),
+    ("UPDATE contacts SET note = '' WHERE id IN (SELECT id FROM contacts LIMIT 10)", "ROW EXCLUSIVE", False),
+    ("VACUUM FULL contacts", "ACCESS EXCLUSIVE", True),
+])
+def test_estimate_lock_impact(statement, lock, blocks_writes):
+    """Інструкції класифікуються за режимом блокування PostgreSQL"""
+    impact = estimate_lock_impact(statement)
+    assert impact.lock == lock
+    assert impact.blocks_writes is blocks_writes
+    assert impact.table == "contacts"
+
+
+def test_dry_run_reports_online_index_build():
+    """Сухий прогін показує, що індекс будується без блокування запису, зокрема на секціях"""
+    impacts = analyze("0001:head", ["partitions=2"])
+    builds = [impact for impact in impacts if "CONCURRENTLY ix_contacts" in impact.statement
+              or "CONCURRENTLY contacts_p" in impact.statement]
+
+    assert {impact.table for impact in builds if impact.statement.startswith("CREATE")} == {"contacts_p0", "contacts_p1"}
+    assert all(impact.lock == "SHARE UPDATE EXCLUSIVE" for impact in builds)
+    assert not any(impact.blocks_writes for impact in impacts
+                   if "INDEX" in impact.statement and impact.table and impact.table.startswith("contacts_p"))
+
+
+def test_dry_run_ignores_tables_created_in_the_same_run():
+    """Блокування на таблицях, створених тим самим прогоном, не рахуються як блокування наявних таблиць"""
+    from_empty = blocking_existing_tables(analyze("head", ["partitions=2"]))
+    from_initial = blocking_existing_tables(analyze("0001:head", ["partitions=2"]))
+
+    assert from_empty == []
+    assert "contacts" in {impact.table for impact in from_initial}
+    assert not {"tags", "contact_tags"} & {impact.table for impact in from_initial}
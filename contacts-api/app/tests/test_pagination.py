@@ -0,0 +1,19 @@
+import pytest
+
+from app.models import Contact
+from app.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    """Курсор зберігає ключ сортування контакту"""
+    cursor = encode_cursor(Contact(id=42, first_name="Іван", last_name="Петренко"))
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("Петренко", "Іван", 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "WzEsMiwzXQ", "WyJhIiwiYiJd"])
+def test_invalid_cursor(cursor):
+    """Пошкоджений курсор відхиляється з ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,46 @@
+import pytest
+
+from app import crud
+from app.models import Contact
+from app.partitioning import partitioned_contacts_ddl
+from app.schemas import ContactUpdate
+
+
+def test_partitioned_ddl():
+    """DDL секціонованої таблиці містить ключ секціонування в первинному ключі та всі секції"""
+    statements = partitioned_contacts_ddl(4)
+    create_table = next(statement for statement in statements if statement.startswith("CREATE TABLE contacts ("))
+
+    assert "PRIMARY KEY (id, user_email)" in create_table
+    assert create_table.endswith("PARTITION BY HASH (user_email)")
+    assert "DEFAULT nextval('contacts_id_seq')" in create_table
+    assert [statement for statement in statements if "PARTITION OF" in statement][-1].endswith(
+        "FOR VALUES WITH (MODULUS 4, REMAINDER 3)")
+    assert "CREATE INDEX ix_contacts_user_email ON contacts (user_email)" in statements
+
+
+def test_partitioned_ddl_requires_partitions():
+    """Кількість секцій має бути додатною"""
+    with pytest.raises(ValueError):
+        partitioned_contacts_ddl(0)
+
+
+@pytest.mark.asyncio
+async def test_crud_queries_filter_by_partition_key(db_session, statements):
+    """Кожен запит crud до contacts містить умову за власником, що дозволяє відкинути зайві секції"""
+    contact = Contact(first_name="John", last_name="Doe", email="john@example.com", user_email="owner@example.com")
+    db_session.add(contact)
+    await db_session.commit()
+    statements.clear()
+
+    assert await crud.get_contact(db_session, contact.id, "other@example.com") is None
+    await crud.get_contacts(db_session, "owner@example.com")
+    await crud.get_contacts_by_ids(db_session, "owner@example.com", [contact.id])
+    await crud.update_contact(db_session, contact.id,
+                              ContactUpdate(first_name="Jack", last_name="Doe", email="jack@example.com"),
+                              "owner@example.com")
+    await crud.delete_contact(db_session, contact.id, "owner@example.com")
+
+    queries = [statement for statement in statements if "contacts" in statement and "WHERE" in statement]
+    assert {statement.split()[0] for statement in queries} == {"SELECT", "UPDATE", "DELETE"}
+    assert all("user_email = ?" in statement for statement in queries)
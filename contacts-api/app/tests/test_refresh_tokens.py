@@ -0,0 +1,100 @@
+import itertools
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import refresh_tokens
+from app.auth import create_access_token, verify_token
+from app.config import Settings, configure_settings
+from app.main import create_app
+from app.refresh_tokens import MAX_FAMILIES, issue_refresh_token, rotate_refresh_token
+from app.resources import get_redis
+from app.tests.fakes import FakeRedis
+
+
+@pytest.mark.asyncio
+async def test_rotation_issues_next_generation():
+    """Оновлення повертає токен наступного покоління тієї самої сім'ї"""
+    redis = FakeRedis()
+    token = await issue_refresh_token(redis, "user@example.com")
+
+    email, rotated = await rotate_refresh_token(redis, token)
+    email, rotated_again = await rotate_refresh_token(redis, rotated)
+
+    first, last = verify_token(token), verify_token(rotated_again)
+    assert email == "user@example.com"
+    assert last["fam"] == first["fam"]
+    assert (first["gen"], last["gen"]) == (1, 3)
+
+
+@pytest.mark.asyncio
+async def test_issue_is_one_transaction():
+    """Вхід записує сім'ю і TTL однією транзакцією Redis"""
+    redis = FakeRedis()
+
+    await issue_refresh_token(redis, "user@example.com")
+
+    assert redis.transactions == 1
+    assert "refresh:user@example.com" in redis.expires
+
+
+@pytest.mark.asyncio
+async def test_reuse_revokes_family():
+    """Повторне використання токена відкликає всю сім'ю, але не інші сесії користувача"""
+    redis = FakeRedis()
+    stolen = await issue_refresh_token(redis, "user@example.com")
+    other_device = await issue_refresh_token(redis, "user@example.com")
+    _, rotated = await rotate_refresh_token(redis, stolen)
+
+    with pytest.raises(HTTPException) as error:
+        await rotate_refresh_token(redis, stolen)
+    assert error.value.status_code == 401
+    with pytest.raises(HTTPException):
+        await rotate_refresh_token(redis, rotated)
+
+    await rotate_refresh_token(redis, other_device)
+    assert len(await redis.hkeys("refresh:user@example.com")) == 1
+
+
+@pytest.mark.asyncio
+async def test_access_token_is_not_a_refresh_token():
+    """Токен доступу не можна використати для оновлення"""
+    redis = FakeRedis()
+    with pytest.raises(HTTPException):
+        await rotate_refresh_token(redis, create_access_token({"sub": "user@example.com"}))
+    assert await redis.hkeys("refresh:user@example.com") == []
+
+
+@pytest.mark.asyncio
+async def test_oldest_families_are_evicted(monkeypatch):
+    """Кількість сесій користувача обмежена, найстаріші витісняються"""
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(refresh_tokens.time, "time", lambda: next(clock))
+    redis = FakeRedis()
+    tokens = [await issue_refresh_token(redis, "user@example.com") for _ in range(MAX_FAMILIES + 2)]
+
+    assert len(await redis.hkeys("refresh:user@example.com")) == MAX_FAMILIES
+    with pytest.raises(HTTPException):
+        await rotate_refresh_token(redis, tokens[0])
+    await rotate_refresh_token(redis, tokens[-1])
+
+
+def test_refresh_endpoint():
+    """Ендпоінт оновлення видає нові токени, а refresh-токен не дає доступу до API"""
+    redis = FakeRedis()
+    app = create_app(Settings(database_url="sqlite+aiosqlite://"))
+    app.dependency_overrides[get_redis] = lambda: redis
+
+    try:
+        with TestClient(app) as client:
+            token = client.portal.call(issue_refresh_token, redis, "user@example.com")
+            response = client.post("/token/refresh", json={"refresh_token": token})
+            assert response.status_code == 200
+            assert verify_token(response.json()["access_token"])["sub"] == "user@example.com"
+
+            assert client.post("/token/refresh", json={"refresh_token": token}).status_code == 401
+            headers = {"Authorization": f"Bearer {response.json()['refresh_token']}"}
+            assert client.get("/contacts", headers=headers).status_code == 401
+    finally:
+        configure_settings(None)
@@ -0,0 +1,155 @@
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+
+from app.models import Contact, ReminderCheckpoint, ReminderDelivery, ReminderFailure, User
+from app.reminders import BirthdayReminderScheduler, occurrences
+
+
+class FakeClock:
+    def __init__(self, today: date):
+        self.today = today
+
+    def __call__(self) -> date:
+        return self.today
+
+
+@pytest_asyncio.fixture
+async def contacts(session_factory):
+    """Фікстура з контактами двох власників з різними днями народження"""
+    async with session_factory() as session:
+        session.add_all([User(email="alice@example.com"), User(email="bob@example.com")])
+        session.add_all([
+            Contact(first_name="Ann", last_name="Lee", email="ann@example.com", birthday=date(1990, 3, 11),
+                    user_email="alice@example.com"),
+            Contact(first_name="Max", last_name="Kay", email="max@example.com", birthday=date(1985, 3, 11),
+                    user_email="alice@example.com"),
+            Contact(first_name="Tom", last_name="Fox", email="tom@example.com", birthday=date(1979, 3, 11),
+                    user_email="bob@example.com"),
+            Contact(first_name="Eve", last_name="Ray", email="eve@example.com", birthday=date(2000, 3, 14),
+                    user_email="bob@example.com"),
+            Contact(first_name="Leap", last_name="Day", email="leap@example.com", birthday=date(1996, 2, 29),
+                    user_email="bob@example.com"),
+            Contact(first_name="No", last_name="Birthday", email="none@example.com", user_email="bob@example.com"),
+        ])
+        await session.commit()
+
+
+def scheduler(session_factory, clock, **kwargs) -> BirthdayReminderScheduler:
+    return BirthdayReminderScheduler(session_factory, clock=clock, **kwargs)
+
+
+def test_occurrences_map_leap_day_in_common_year():
+    """У невисокосний рік 29 лютого відзначається 28 лютого"""
+    assert occurrences(date(2023, 2, 27), date(2023, 3, 1)) == {
+        227: date(2023, 2, 27), 228: date(2023, 2, 28), 229: date(2023, 2, 28), 301: date(2023, 3, 1),
+    }
+    assert 229 not in occurrences(date(2024, 2, 28), date(2024, 2, 28))
+
+
+@pytest.mark.asyncio
+async def test_digest_is_sent_once_per_owner(session_factory, contacts, smtp):
+    """Кожен власник отримує один лист з усіма днями народження вікна, повторний запуск нічого не надсилає"""
+    clock = FakeClock(date(2024, 3, 10))
+    reminders = scheduler(session_factory, clock)
+
+    assert await reminders.run_once() == 2
+    assert await reminders.run_once() == 0
+
+    by_recipient = {recipients[0]: body for _, recipients, body in smtp.messages}
+    assert set(by_recipient) == {"alice@example.com", "bob@example.com"}
+    assert "Ann Lee" in by_recipient["alice@example.com"] and "Max Kay" in by_recipient["alice@example.com"]
+    assert "Eve Ray" not in by_recipient["bob@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_downtime_is_caught_up_in_one_window(engine, session_factory, contacts, smtp):
+    """Після простою пропущені дні обробляються одним запитом до contacts"""
+    clock = FakeClock(date(2024, 3, 10))
+    reminders = scheduler(session_factory, clock)
+    await reminders.run_once()
+    smtp.messages.clear()
+
+    statements = []
+    sync_engine = engine.sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    try:
+        clock.today += timedelta(days=3)
+        assert await reminders.run_once() == 1
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+
+    assert [recipients for _, recipients, _ in smtp.messages] == [["bob@example.com"]]
+    assert "Eve Ray" in smtp.messages[0][2]
+    assert len([statement for statement in statements if "FROM contacts" in statement]) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried_without_resending(session_factory, contacts):
+    """Після збою повторюються лише ненадіслані листи, а контрольна точка рухається одразу"""
+    sent = []
+
+    async def flaky_send(email, digest):
+        if email == "bob@example.com":
+            raise ConnectionError("SMTP is down")
+        sent.append(email)
+
+    async def send(email, digest):
+        sent.append(email)
+
+    clock = FakeClock(date(2024, 3, 10))
+    assert await scheduler(session_factory, clock, send=flaky_send, batch_size=1).run_once() == 1
+
+    async with session_factory() as session:
+        assert (await session.get(ReminderCheckpoint, "birthdays")).last_date == date(2024, 3, 10)
+        assert (await session.get(ReminderFailure, (date(2024, 3, 11), "bob@example.com"))).attempts == 1
+
+    # Перезапуск воркера: новий планувальник бачить лише прогрес у базі
+    assert await scheduler(session_factory, clock, send=send).run_once() == 1
+    assert sent == ["alice@example.com", "bob@example.com"]
+
+    async with session_factory() as session:
+        assert (await session.get(ReminderCheckpoint, "birthdays")).last_date == date(2024, 3, 10)
+        assert await session.scalar(select(func.count()).select_from(ReminderFailure)) == 0
+
+
+@pytest.mark.asyncio
+async def test_permanently_failing_recipient_does_not_hold_checkpoint(session_factory, contacts):
+    """Адресат, якому лист не доходить ніколи, отримує обмежену кількість спроб і не зупиняє контрольну точку"""
+    attempts = []
+
+    async def send(email, digest):
+        if email == "bob@example.com":
+            attempts.append(digest)
+            raise ConnectionError("Mailbox unavailable")
+
+    clock = FakeClock(date(2024, 3, 10))
+    reminders = scheduler(session_factory, clock, send=send, max_attempts=2)
+    for _ in range(5):
+        await reminders.run_once()
+        clock.today += timedelta(days=1)
+
+    # Кожен дайджест повторено один раз, далі спроби не тривають
+    assert [digest[0][1] for digest in attempts] == [date(2024, 3, 11), date(2024, 3, 11),
+                                                      date(2024, 3, 14), date(2024, 3, 14)]
+    async with session_factory() as session:
+        assert (await session.get(ReminderCheckpoint, "birthdays")).last_date == date(2024, 3, 14)
+        assert await session.scalar(select(func.count()).select_from(ReminderDelivery)) == 0
+        failures = (await session.scalars(select(ReminderFailure.attempts))).all()
+        assert failures == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_leap_day_birthday_in_common_year(session_factory, contacts):
+    """Контакт, народжений 29 лютого, потрапляє в дайджест 28 лютого невисокосного року"""
+    digests = []
+
+    async def send(email, digest):
+        digests.append((email, digest))
+
+    await scheduler(session_factory, FakeClock(date(2023, 2, 27)), send=send).run_once()
+
+    assert digests == [("bob@example.com", [("Leap Day", date(2023, 2, 28))])]
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import resources
+from app.main import create_app
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_import_main_does_not_load_clients():
+    """Імпорт застосунку не завантажує важкі клієнтські бібліотеки"""
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('fastapi_mail', 'cloudinary', 'redis', 'passlib', 'fastapi_cache') "
+        "if m in sys.modules))"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+@pytest.mark.asyncio
+async def test_get_redis_is_created_once():
+    """Клієнт Redis створюється один раз і скидається під час закриття"""
+    redis = resources.get_redis()
+    assert resources.get_redis() is redis
+
+    await resources.close_resources()
+    assert resources._redis is None
+
+
+def test_get_mail_requires_configuration():
+    """Без налаштувань пошти клієнт не створюється"""
+    with pytest.raises(RuntimeError):
+        resources.get_mail()
+
+
+def test_lifespan_closes_resources(settings):
+    """Ресурси, створені під час старту, закриваються під час зупинки"""
+    app = create_app(settings)
+    with TestClient(app):
+        assert resources._redis is not None
+    assert resources._redis is None
+
+
+def test_rate_limit_storage_is_shared(settings):
+    """Лічильники rate limit зберігаються в Redis, спільному для всіх воркерів"""
+    # Без окремого сховища rate limit використовує redis_url
+    app = create_app(settings.model_copy(update={"rate_limit_storage_uri": None}))
+    with TestClient(app) as client:
+        assert type(app.state.limiter._storage).__name__ == "RedisStorage"
+        assert client.get("/healthz").json() == {"status": "ok"}
@@ -0,0 +1,149 @@
+"""
+Накладні витрати логування на запит.
+
+Застосунок запускається в процесі (без мережі) з тимчасовою SQLite, і
+``GET /contacts`` виконується послідовно в кількох режимах логування; усі
+записи пишуться у файл:
+
+* ``off`` — лише WARNING і вище, SQL не логується;
+* ``sync`` — журнал доступу і кожен SQL-запит форматуються в JSON і
+  пишуться у файл прямо в циклі подій (як ``echo=True`` раніше);
+* ``queue`` — те саме через ``QueueHandler``: у циклі подій запис лише
+  кладеться в чергу, JSON і файл — у потоці ``QueueListener``;
+* ``queue sampled`` — черга, SQL лише для ``--sample-rate`` запитів.
+
+Виводяться затримка запиту, різниця з ``off`` і кількість рядків у файлі.
+``--sink-latency-ms`` додає затримку до кожного запису у файл, імітуючи
+повільного споживача stderr (заповнений канал, мережевий збирач логів).
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m benchmarks.bench_logging --requests 2000
+    python -m benchmarks.bench_logging --requests 2000 --sink-latency-ms 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.auth import create_access_token
+from app.config import Settings
+from app.log import JsonFormatter, RequestIdFilter, setup_logging, stop_logging
+from app.main import create_app
+from app.models import Contact
+from app.partitioning import create_schema
+
+OWNER = "bench@example.com"
+MODES = ("off", "sync", "queue", "queue sampled")
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def _seed(database_url: str, contacts: int) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+        await conn.execute(insert(Contact), [
+            {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com", "user_email": OWNER}
+            for i in range(contacts)
+        ])
+    await engine.dispose()
+
+
+class _SlowStream:
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def _configure(mode: str, stream, sample_rate: float):
+    """Замінює обробник, підключений lifespan, на обробник режиму; повертає функцію зупинки"""
+    # Клієнт httpx працює в тому самому процесі і логує кожен запит
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sql_logger = logging.getLogger("sqlalchemy.engine")
+    sql_logger.setLevel(logging.WARNING if mode == "off" else logging.INFO)
+    listener = setup_logging("WARNING" if mode == "off" else "INFO",
+                             sample_rate=sample_rate if mode == "queue sampled" else 1.0, stream=stream)
+    if mode != "sync":
+        return lambda: stop_logging(listener)
+
+    stop_logging(listener)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestIdFilter())
+    logging.getLogger().addHandler(handler)
+    return lambda: logging.getLogger().removeHandler(handler)
+
+
+async def _run(settings: Settings, mode: str, path: str, requests: int, sample_rate: float,
+               sink_latency: float) -> dict:
+    app = create_app(settings)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': OWNER})}"}
+    log_path = os.path.join(os.path.dirname(settings.database_url.split("///")[-1]), f"{mode.replace(' ', '_')}.log")
+    samples = []
+    with open(log_path, "w", encoding="utf-8") as stream:
+        async with app.router.lifespan_context(app):
+            stop = _configure(mode, _SlowStream(stream, sink_latency) if sink_latency else stream, sample_rate)
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+                    for _ in range(requests // 10):
+                        (await client.get(path)).raise_for_status()
+                    for _ in range(requests):
+                        started = time.perf_counter()
+                        (await client.get(path)).raise_for_status()
+                        samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                stop()
+    with open(log_path, encoding="utf-8") as stream:
+        lines = sum(1 for _ in stream)
+    return {"samples": samples, "lines": lines}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10, help="contacts per response")
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--sink-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = Settings(
+            database_url=f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}",
+            rate_limit_storage_uri="memory://",
+        )
+        asyncio.run(_seed(settings.database_url, args.limit))
+
+        results = {mode: asyncio.run(_run(settings, mode, f"/contacts?limit={args.limit}", args.requests,
+                                          args.sample_rate, args.sink_latency_ms / 1000))
+                   for mode in MODES}
+
+    baseline = statistics.mean(results["off"]["samples"])
+    print(f"{'mode':<15}{'mean ms':>10}{'p99 ms':>10}{'+us/req':>10}{'log lines':>11}")
+    for mode, result in results.items():
+        mean = statistics.mean(result["samples"])
+        print(f"{mode:<15}{mean:>10.3f}{_percentile(result['samples'], 99):>10.3f}"
+              f"{(mean - baseline) * 1000:>10.0f}{result['lines']:>11}")
+
+
+if __name__ == "__main__":
+    main()
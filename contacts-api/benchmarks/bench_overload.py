@@ -0,0 +1,201 @@
+"""
+Затримка під перевантаженням з контролем допуску і без нього.
+
+Запускає ``python -m app.serve --workers 1`` на тимчасовій SQLite з контактами
+одного власника і спершу у замкненому циклі вимірює пропускну здатність двох
+класів маршрутів:
+
+* ``reads`` — ``GET /contacts``;
+* ``auth`` — ``POST /token`` з неправильним паролем. Невдалий вхід (як під час
+  підбору паролів) перевіряє bcrypt так само, як і вдалий, але не потребує Redis
+  для refresh-токена; очікувана відповідь — ``401``.
+
+Потім для ``ADMISSION_CONTROL=false`` і ``true`` подається відкрите
+навантаження у двох сценаріях:
+
+* ``reads`` — лише читання з частотою ``--overload`` × пропускна здатність;
+* ``mixed`` — читання з частотою ``--read-load`` × пропускна здатність (нижче
+  межі) разом із хвилею входів ``--login-load`` × пропускна здатність входу.
+  Показує, чи затримує хвиля входів читання.
+
+Запити надсилаються за розкладом незалежно від відповідей, а затримка рахується
+від запланованого часу відправки, тож черга на клієнті теж враховується. Для
+кожного класу виводиться корисна пропускна здатність, частка відповідей 503 і
+перцентилі затримки обслужених запитів.
+
+Клієнт працює на тій самій машині, що й сервер, і забирає частину процесора.
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m benchmarks.bench_overload --duration 10 --overload 2
+    python -m benchmarks.bench_overload --duration 10 --read-load 0.5 --login-load 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.auth import create_access_token, hash_password
+from app.models import Contact, User
+from app.partitioning import create_schema
+from benchmarks.bench_workers import PROJECT_DIR, _wait_ready
+
+OWNER = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+class Stream(NamedTuple):
+    # Клас маршруту, як в app.admission
+    name: str
+    send: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+    # Код відповіді обслуженого запиту
+    expected: int
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def _seed(database_url: str, contacts: int) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+        await conn.execute(insert(User), [{"email": OWNER, "hashed_password": hash_password(PASSWORD)}])
+        await conn.execute(insert(Contact), [
+            {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com", "user_email": OWNER}
+            for i in range(contacts)
+        ])
+    await engine.dispose()
+
+
+def _start_server(database_url: str, port: int, admission: bool) -> subprocess.Popen:
+    env = dict(os.environ, LOG_LEVEL="warning", DATABASE_URL=database_url, DB_ECHO="false",
+               RATE_LIMIT_STORAGE_URI="memory://", ADMISSION_CONTROL=str(admission).lower())
+    server = subprocess.Popen([sys.executable, "-m", "app.serve", "--workers", "1", "--port", str(port)],
+                              cwd=PROJECT_DIR, env=env)
+    _wait_ready(f"http://127.0.0.1:{port}/healthz")
+    return server
+
+
+def _stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=60)
+
+
+async def _capacity(stream: Stream, duration: float, concurrency: int) -> float:
+    done = 0
+    deadline = time.perf_counter() + duration
+    async with httpx.AsyncClient(timeout=60) as client:
+        async def worker():
+            nonlocal done
+            while time.perf_counter() < deadline:
+                response = await stream.send(client)
+                if response.status_code != stream.expected:
+                    response.raise_for_status()
+                done += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / duration
+
+
+async def _open_loop(streams: Dict[Stream, float], duration: float, timeout: float) -> Dict[str, dict]:
+    results = {stream.name: {"ok": [], "shed": 0, "failed": 0, "offered": 0} for stream in streams}
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def send(stream: Stream, scheduled: float):
+            result = results[stream.name]
+            try:
+                response = await stream.send(client)
+            except httpx.HTTPError:
+                result["failed"] += 1
+                return
+            if response.status_code == stream.expected:
+                result["ok"].append((time.perf_counter() - scheduled) * 1000)
+            elif response.status_code == 503:
+                result["shed"] += 1
+            else:
+                result["failed"] += 1
+
+        async def schedule(stream: Stream, rate: float, started: float):
+            tasks = []
+            for number in range(int(rate * duration)):
+                scheduled = started + number / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(stream, scheduled)))
+            results[stream.name]["offered"] = len(tasks)
+            await asyncio.gather(*tasks)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(schedule(stream, rate, started) for stream, rate in streams.items() if rate > 0))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--overload", type=float, default=2.0, help="reads-only load as a multiple of capacity")
+    parser.add_argument("--read-load", type=float, default=0.5, help="mixed scenario: reads as a multiple of capacity")
+    parser.add_argument("--login-load", type=float, default=4.0,
+                        help="mixed scenario: logins as a multiple of login capacity")
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=500, help="contacts per response")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight while measuring capacity")
+    parser.add_argument("--timeout", type=float, default=60, help="client timeout, seconds")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': OWNER})}"}
+    reads = Stream("reads", lambda client: client.get(f"{base_url}/contacts?limit={args.limit}", headers=headers), 200)
+    logins = Stream("auth", lambda client: client.post(f"{base_url}/token",
+                                                       data={"username": OWNER, "password": "wrong-password"}), 401)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        asyncio.run(_seed(database_url, args.contacts))
+
+        server = _start_server(database_url, args.port, admission=False)
+        try:
+            capacity = {stream: asyncio.run(_capacity(stream, args.duration / 2, args.concurrency))
+                        for stream in (reads, logins)}
+        finally:
+            _stop_server(server)
+        print(", ".join(f"{stream.name} capacity {rate:.1f} req/s" for stream, rate in capacity.items()))
+
+        scenarios = {
+            "reads": {reads: capacity[reads] * args.overload},
+            "mixed": {reads: capacity[reads] * args.read_load, logins: capacity[logins] * args.login_load},
+        }
+        print(f"{'scenario':<10}{'admission':<11}{'class':<7}{'offered/s':>10}{'ok req/s':>10}{'503 %':>8}"
+              f"{'failed':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for scenario, streams in scenarios.items():
+            for admission in (False, True):
+                server = _start_server(database_url, args.port, admission)
+                try:
+                    results = asyncio.run(_open_loop(streams, args.duration, args.timeout))
+                finally:
+                    _stop_server(server)
+                for name, result in results.items():
+                    ok = result["ok"] or [float("nan")]
+                    offered = result["offered"] or 1
+                    print(f"{scenario:<10}{'on' if admission else 'off':<11}{name:<7}"
+                          f"{result['offered'] / args.duration:>10.1f}{len(result['ok']) / args.duration:>10.1f}"
+                          f"{100 * result['shed'] / offered:>8.1f}{result['failed']:>8}"
+                          f"{statistics.median(ok):>10.0f}{_percentile(ok, 99):>10.0f}{max(ok):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
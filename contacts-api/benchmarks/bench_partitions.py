@@ -0,0 +1,101 @@
+"""
+Затримка запитів одного власника залежно від загального розміру таблиці contacts.
+
+Потрібен PostgreSQL: бенчмарк видаляє і створює таблиці ``users`` та ``contacts``
+у базі з ``--database-url`` (або ``DATABASE_URL``), тому не запускайте його на
+робочій базі. Для кожного режиму (звичайна таблиця і хеш-секціонована) таблиця
+поступово заповнюється до кожного розміру з ``--sizes``, після чого вимірюється
+затримка ``crud.get_contacts`` і ``crud.get_contact`` для випадкових власників.
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m benchmarks.bench_partitions --database-url postgresql+asyncpg://... --sizes 100000,1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.models import Base
+from app.partitioning import create_schema
+
+
+async def _fill(conn, start: int, stop: int, owners: int) -> None:
+    await conn.execute(text(
+        "INSERT INTO contacts (first_name, last_name, email, phone, user_email) "
+        "SELECT 'First' || n, 'Last' || n, 'c' || n || '@example.com', '555-' || n, "
+        "'owner' || (n % :owners) || '@example.com' "
+        "FROM generate_series(:start, :stop - 1) AS n"
+    ), {"start": start, "stop": stop, "owners": owners})
+    await conn.execute(text("ANALYZE contacts"))
+
+
+async def _measure(session_factory, owners: int, queries: int) -> dict:
+    latencies = {"get_contacts": [], "get_contact": []}
+    async with session_factory() as db:
+        for _ in range(queries):
+            owner = f"owner{random.randrange(owners)}@example.com"
+            started = time.perf_counter()
+            contacts = await crud.get_contacts(db, owner, 0, 50)
+            latencies["get_contacts"].append(time.perf_counter() - started)
+
+            if contacts:
+                started = time.perf_counter()
+                await crud.get_contact(db, random.choice(contacts).id, owner)
+                latencies["get_contact"].append(time.perf_counter() - started)
+            db.expunge_all()
+    return {name: values for name, values in latencies.items() if values}
+
+
+async def run(database_url: str, partitions: int, sizes, owners: int, queries: int) -> None:
+    engine = create_async_engine(database_url)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession)
+    print(f"{'mode':<14}{'rows':>12}{'query':>14}{'p50, ms':>10}{'p95, ms':>10}")
+    for mode_partitions in (0, partitions):
+        mode = f"hash/{mode_partitions}" if mode_partitions else "plain"
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text("DROP SEQUENCE IF EXISTS contacts_id_seq"))
+            await conn.run_sync(create_schema, mode_partitions)
+            await conn.execute(text(
+                "INSERT INTO users (email, hashed_password) "
+                "SELECT 'owner' || n || '@example.com', '' FROM generate_series(0, :owners - 1) AS n"
+            ), {"owners": owners})
+
+        filled = 0
+        for size in sizes:
+            async with engine.begin() as conn:
+                await _fill(conn, filled, size, owners)
+            filled = size
+            for name, values in (await _measure(session_factory, owners, queries)).items():
+                values.sort()
+                p95 = values[int(len(values) * 0.95) - 1]
+                print(f"{mode:<14}{size:>12}{name:>14}{statistics.median(values) * 1000:>10.2f}{p95 * 1000:>10.2f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--sizes", default="100000,1000000,5000000",
+                        help="comma-separated total row counts, ascending")
+    parser.add_argument("--owners", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    if not args.database_url or not args.database_url.startswith("postgresql"):
+        parser.error("a PostgreSQL --database-url is required")
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    asyncio.run(run(args.database_url, args.partitions, sizes, args.owners, args.queries))
+
+
+if __name__ == "__main__":
+    main()
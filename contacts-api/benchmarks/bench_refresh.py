@@ -0,0 +1,104 @@
+"""
+Вартість оновлення токена порівняно з повторним входом.
+
+Вхід (``POST /token``) читає користувача з бази і перевіряє пароль bcrypt;
+оновлення (``POST /token/refresh``) лише перевіряє підпис JWT і виконує одну
+команду ``HINCRBY`` у Redis. Бенчмарк запускає застосунок у процесі (без
+мережі до API) з тимчасовою SQLite і Redis з ``REDIS_URL`` та виводить
+затримки обох запитів і кількість SQL-запитів на запит.
+
+Запуск з каталогу ``contacts-api`` (потрібен Redis)::
+
+    python -m benchmarks.bench_refresh --requests 200 --redis-url redis://localhost
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+import httpx
+from sqlalchemy import event
+
+from app import database
+from app.auth import hash_password
+from app.config import Settings
+from app.main import create_app
+from app.models import Base, User
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def _measure(client: httpx.AsyncClient, requests: int, send) -> List[float]:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await send()
+        samples.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return samples
+
+
+async def run(app, requests: int) -> None:
+    async with app.router.lifespan_context(app):
+        database.get_sessionmaker()
+        async with database.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with database.AsyncSessionLocal() as session, session.begin():
+            session.add(User(email=EMAIL, hashed_password=hash_password(PASSWORD)))
+
+        statements = []
+        event.listen(database.engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            login = lambda: client.post("/token", data={"username": EMAIL, "password": PASSWORD})
+            statements.clear()
+            login_samples = await _measure(client, requests, login)
+            login_sql = len(statements) / requests
+
+            # Кожен вхід відкриває нову сесію, тож оновлюється токен останнього входу
+            refresh_token = (await login()).json()["refresh_token"]
+
+            async def refresh():
+                nonlocal refresh_token
+                response = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+                refresh_token = response.json().get("refresh_token", refresh_token)
+                return response
+
+            statements.clear()
+            refresh_samples = await _measure(client, requests, refresh)
+            results = [("login", login_samples, login_sql), ("refresh", refresh_samples, len(statements) / requests)]
+
+    print(f"{'endpoint':<10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'SQL/req':>10}")
+    for name, samples, sql_per_request in results:
+        print(f"{name:<10}{statistics.mean(samples):>10.2f}{_percentile(samples, 50):>10.2f}"
+              f"{_percentile(samples, 99):>10.2f}{1000 / statistics.mean(samples):>10.0f}{sql_per_request:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = Settings(
+            database_url=f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}",
+            db_echo=False,
+            redis_url=args.redis_url,
+            rate_limit_storage_uri="memory://",
+        )
+        asyncio.run(run(create_app(settings), args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Вимірювання часу імпорту та холодного старту застосунку.
+
+Кожен замір виконується в окремому процесі інтерпретатора, тому враховує
+повний імпорт залежностей. Для порівняння вимірюється також «жадібний» варіант,
+у якому клієнтські бібліотеки імпортуються одразу, як це було до переходу на
+ліниву ініціалізацію.
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m benchmarks.bench_startup --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = (
+    "fastapi_mail",
+    "cloudinary.uploader",
+    "redis.asyncio",
+    "passlib.context",
+    "fastapi_cache.backends.redis",
+)
+
+SCENARIOS = {
+    "import app.main": "import app.main",
+    "import app.main (eager clients)": "import app.main; " + "; ".join(f"import {m}" for m in EAGER_IMPORTS),
+    "cold start (import + lifespan)": (
+        "from fastapi.testclient import TestClient\n"
+        "from app.config import Settings\n"
+        "from app.main import create_app\n"
+        "with TestClient(create_app(Settings(database_url='sqlite+aiosqlite://'))):\n"
+        "    pass\n"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "_start = time.perf_counter()\n"
+    "{code}\n"
+    "print(time.perf_counter() - _start)\n"
+)
+
+
+def measure(code: str, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", TIMER.format(code=code)],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<36}{'median, ms':>12}{'min, ms':>12}")
+    for name, code in SCENARIOS.items():
+        timings = measure(code, args.runs)
+        print(f"{name:<36}{statistics.median(timings):>12.1f}{min(timings):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Фільтрація контактів за мітками, курсорна пагінація і масове призначення міток.
+
+Кожен із ``--owners`` власників отримує ``--contacts`` контактів і ``--tags``
+міток; кожна мітка призначається випадковим контактам одним запитом
+``crud.assign_tags``. Назви міток також записуються в ``additional_data``,
+щоб порівняти індексований фільтр із пошуком ``LIKE`` по тексту, як це
+доводилося робити без моделі міток. Виводяться затримки:
+
+* першої сторінки з фільтром за однією міткою, двома (any/all) та ``LIKE``;
+* сторінки посередині списку за курсором і за ``OFFSET``;
+* масового призначення мітки ``--assign`` контактам;
+* списку міток із кількістю контактів.
+
+За замовчуванням використовується тимчасова SQLite; з ``--database-url``
+бенчмарк видаляє і створює таблиці в указаній базі, тому не запускайте його
+на робочій базі.
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m benchmarks.bench_tags --contacts 50000 --tags 300
+    python -m benchmarks.bench_tags --database-url postgresql+asyncpg://... --contacts 50000 --tags 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.models import Base, Contact, Tag, User
+from app.partitioning import create_schema
+
+PAGE = 50
+CHUNK = 5_000
+
+
+def _owner(number: int) -> str:
+    return f"owner{number}@example.com"
+
+
+async def _fill(session_factory, owners: int, contacts: int, tags: int, tags_per_contact: int) -> List[float]:
+    assign_samples = []
+    for number in range(owners):
+        owner = _owner(number)
+        names = [f"tag{i}" for i in range(tags)]
+        memberships = {name: [] for name in names}
+        rows = []
+        for i in range(contacts):
+            contact_tags = random.sample(names, tags_per_contact)
+            rows.append({
+                "first_name": f"First{random.randrange(contacts)}",
+                "last_name": f"Last{random.randrange(contacts // 10 or 1)}",
+                "email": f"c{i}@example.com",
+                "additional_data": f",{','.join(contact_tags)},",
+                "user_email": owner,
+            })
+            for name in contact_tags:
+                memberships[name].append(i)
+
+        async with session_factory() as db, db.begin():
+            db.add(User(email=owner, hashed_password="-"))
+            await db.flush()
+            contact_ids = []
+            for start in range(0, contacts, CHUNK):
+                result = await db.scalars(insert(Contact).returning(Contact.id, sort_by_parameter_order=True),
+                                          rows[start:start + CHUNK])
+                contact_ids += result.all()
+            await db.execute(insert(Tag), [{"name": name, "user_email": owner} for name in names])
+
+        for name, positions in memberships.items():
+            async with session_factory() as db, db.begin():
+                started = time.perf_counter()
+                await crud.assign_tags(db, owner, [name], [contact_ids[position] for position in positions])
+                # Без фіксації: вимірюється сама інструкція
+                assign_samples.append((time.perf_counter() - started) * 1000)
+    return assign_samples
+
+
+async def _time(session_factory, queries: int, run) -> List[float]:
+    samples = []
+    async with session_factory() as db:
+        for _ in range(queries):
+            started = time.perf_counter()
+            await run(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def _measure(session_factory, args) -> dict:
+    owner = _owner(0)
+    tag = lambda: f"tag{random.randrange(args.tags)}"
+    middle = args.contacts // 2
+
+    async with session_factory() as db:
+        # Курсор сторінки посередині списку: ключ контакту на позиції middle - 1
+        before = (await crud.get_contacts(db, owner, skip=middle - 1, limit=1))[0]
+        cursor = (before.last_name, before.first_name, before.id)
+
+    async def like(db):
+        await db.execute(
+            select(Contact)
+            .where(Contact.user_email == owner, Contact.additional_data.like(f"%,{tag()},%"))
+            .order_by(Contact.last_name, Contact.first_name, Contact.id)
+            .limit(PAGE)
+        )
+
+    async def assign(db):
+        # Нова мітка щоразу: вимірюється вставка, а не пропуск наявних пар. Транзакція
+        # відкочується, щоб у вимірювання не потрапляв fsync під час фіксації
+        name = f"bulk{random.getrandbits(48)}"
+        contact_ids = random.sample(range(1, args.contacts + 1), args.assign)
+        async with db.begin() as transaction:
+            await crud.create_tag(db, name, owner)
+            await crud.assign_tags(db, owner, [name], contact_ids)
+            await transaction.rollback()
+
+    cases = {
+        "tag filter (1 tag)": lambda db: crud.get_contacts(db, owner, limit=PAGE, tags=[tag()]),
+        "tag filter (2, any)": lambda db: crud.get_contacts(db, owner, limit=PAGE, tags=[tag(), tag()]),
+        "tag filter (2, all)": lambda db: crud.get_contacts(db, owner, limit=PAGE, tags=[tag(), tag()],
+                                                            match_all=True),
+        "LIKE additional_data": like,
+        "middle page, cursor": lambda db: crud.get_contacts(db, owner, limit=PAGE, after=cursor),
+        "middle page, OFFSET": lambda db: crud.get_contacts(db, owner, skip=middle, limit=PAGE),
+        f"assign {args.assign} contacts": assign,
+        "list tags with counts": lambda db: crud.get_tags(db, owner),
+    }
+    return {name: await _time(session_factory, args.queries, run) for name, run in cases.items()}
+
+
+async def run(database_url: str, args) -> None:
+    engine = create_async_engine(database_url)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(create_schema)
+
+        started = time.perf_counter()
+        assign_samples = await _fill(session_factory, args.owners, args.contacts, args.tags, args.tags_per_contact)
+        print(f"filled {args.owners} x {args.contacts} contacts, {args.tags} tags in {time.perf_counter() - started:.1f} s; "
+              f"assign_tags per tag: mean {statistics.mean(assign_samples):.2f} ms")
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+
+        results = await _measure(session_factory, args)
+    finally:
+        await engine.dispose()
+
+    print(f"{'query':<26}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}")
+    for name, samples in results.items():
+        print(f"{name:<26}{statistics.mean(samples):>10.2f}{statistics.median(samples):>10.2f}{max(samples):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--owners", type=int, default=2)
+    parser.add_argument("--contacts", type=int, default=50_000)
+    parser.add_argument("--tags", type=int, default=300)
+    parser.add_argument("--tags-per-contact", type=int, default=3)
+    parser.add_argument("--assign", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}", args))
+
+
+if __name__ == "__main__":
+    main()
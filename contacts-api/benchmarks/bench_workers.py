@@ -0,0 +1,95 @@
+"""
+Пропускна здатність залежно від кількості воркерів.
+
+Для кожного N від 1 до кількості ядер запускає ``python -m app.serve --workers N``,
+навантажує ``GET /healthz`` з кількох клієнтських процесів протягом заданого часу
+та виводить кількість запитів за секунду. Клієнти працюють на тій самій машині,
+тому на малій кількості ядер вони конкурують із сервером за процесор.
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m benchmarks.bench_workers --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _load(url: str, duration: float, concurrency: int) -> int:
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient() as client:
+        async def worker():
+            nonlocal done
+            while time.perf_counter() < deadline:
+                response = await client.get(url)
+                response.raise_for_status()
+                done += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done
+
+
+def _client_process(args) -> int:
+    return asyncio.run(_load(*args))
+
+
+def _wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server did not become ready at {url}")
+
+
+def run(workers: int, port: int, duration: float, clients: int, concurrency: int) -> float:
+    env = dict(os.environ, LOG_LEVEL="warning")
+    env.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+    env.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port)],
+        cwd=PROJECT_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}/healthz"
+    try:
+        _wait_ready(url)
+        with multiprocessing.Pool(clients) as pool:
+            counts = pool.map(_client_process, [(url, duration, concurrency)] * clients)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return sum(counts) / duration
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-workers", type=int, default=cores)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=max(1, cores // 2))
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per client process")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'req/s':>12}")
+    for workers in range(1, args.max_workers + 1):
+        rps = run(workers, args.port, args.duration, args.clients, args.concurrency)
+        print(f"{workers:>8}{rps:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# Конфігурація gunicorn для запуску кількох воркерів uvicorn:
+#
+#     gunicorn -c gunicorn.conf.py app.main:app
+#
+# Перелік спільного та локального для воркера стану наведено в app/serve.py.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Імпорт app.main не відкриває підключень, тому код можна завантажити один раз
+# у головному процесі; Redis і пул бази даних створюються вже у воркерах.
+preload_app = True
+
+# Після SIGTERM воркер перестає приймати з'єднання і має graceful_timeout секунд,
+# щоб завершити запити, що виконуються, та закрити ресурси в lifespan.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+# Перезапуск воркерів після певної кількості запитів обмежує накопичення пам'яті.
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
@@ -0,0 +1,135 @@
+"""
+Звіт про блокування, які візьмуть міграції, без їх виконання.
+
+Генерує SQL ревізій у режимі ``alembic upgrade --sql`` для діалекту
+PostgreSQL і для кожної інструкції показує режим блокування, чи блокує вона
+читання/запис і якої таблиці стосується. З ``--estimate-rows`` підключається
+до бази (лише читання ``pg_class``) і додає оцінку кількості рядків таблиці,
+тобто обсяг роботи, що виконуватиметься під блокуванням.
+
+Запуск з каталогу ``contacts-api``::
+
+    python -m migrations.dry_run
+    python -m migrations.dry_run --from 0001 --to head -x partitions=16 --estimate-rows
+"""
+import argparse
+import asyncio
+import io
+import os
+from typing import Dict, List, Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from migrations.helpers import LockImpact, estimate_lock_impact
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OFFLINE_URL = "postgresql+asyncpg://"
+
+
+def render_sql(revision_range: str, x_arguments: Optional[List[str]] = None) -> str:
+    """
+    Повертає SQL міграцій для діапазону ревізій, не підключаючись до бази.
+
+    :param revision_range: Ревізія або діапазон ``from:to``
+    :param x_arguments: Аргументи ``-x`` для env.py і ревізій
+    :return: SQL-скрипт
+    """
+    config = Config(os.path.join(PROJECT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", OFFLINE_URL)
+    config.cmd_opts = argparse.Namespace(x=x_arguments or [])
+    buffer = io.StringIO()
+    config.output_buffer = buffer
+    command.upgrade(config, revision_range, sql=True)
+    return buffer.getvalue()
+
+
+def split_statements(sql: str) -> List[str]:
+    statements = []
+    for chunk in sql.split(";\n"):
+        lines = [line for line in chunk.splitlines() if line.strip() and not line.lstrip().startswith("--")]
+        if lines:
+            statements.append("\n".join(lines))
+    return statements
+
+
+def analyze(revision_range: str, x_arguments: Optional[List[str]] = None) -> List[LockImpact]:
+    return [estimate_lock_impact(statement) for statement in split_statements(render_sql(revision_range, x_arguments))]
+
+
+def blocking_existing_tables(impacts: List[LockImpact], rows: Optional[Dict[str, int]] = None) -> List[LockImpact]:
+    """
+    Відбирає інструкції, що блокують запис у таблиці, які існували до міграції.
+
+    Таблиці, створені попередніми інструкціями того самого прогону, нові й
+    порожні, тож блокування на них нікого не затримує.
+
+    :param impacts: Результат ``analyze`` в порядку виконання, разом з інструкціями без блокувань
+    :param rows: Оцінка рядків таблиць; таблиці з нулем рядків теж не враховуються
+    :return: Інструкції, що блокують запис
+    """
+    rows = rows or {}
+    created = set()
+    blocking = []
+    for impact in impacts:
+        if not impact.table:
+            continue
+        if impact.statement.upper().startswith("CREATE TABLE"):
+            created.add(impact.table)
+        elif impact.blocks_writes and impact.table not in created and rows.get(impact.table, 1):
+            blocking.append(impact)
+    return blocking
+
+
+async def estimate_rows(database_url: str, tables: List[str]) -> Dict[str, int]:
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(:tables)"),
+                {"tables": tables},
+            )
+            return {name: max(rows, 0) for name, rows in result}
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--from", dest="from_revision", default=None,
+                        help="current revision; by default the whole history from an empty database")
+    parser.add_argument("--to", dest="to_revision", default="head")
+    parser.add_argument("-x", action="append", default=[], help="additional arguments for migrations")
+    parser.add_argument("--estimate-rows", action="store_true", help="read table sizes from the database")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+
+    revision_range = f"{args.from_revision}:{args.to_revision}" if args.from_revision else args.to_revision
+    statements = analyze(revision_range, args.x)
+    impacts = [impact for impact in statements if impact.lock != "none"]
+
+    rows: Dict[str, int] = {}
+    if args.estimate_rows:
+        if not args.database_url:
+            parser.error("--estimate-rows requires --database-url or DATABASE_URL")
+        tables = sorted({impact.table for impact in impacts if impact.table})
+        rows = asyncio.run(estimate_rows(args.database_url, tables))
+
+    print(f"{'lock':<24}{'reads':<7}{'writes':<8}{'table':<16}{'rows':>12}  statement")
+    for impact in impacts:
+        row_count = rows.get(impact.table, "") if impact.table else ""
+        statement = impact.statement if len(impact.statement) <= 80 else impact.statement[:77] + "..."
+        print(f"{impact.lock:<24}{'block' if impact.blocks_reads else 'ok':<7}"
+              f"{'block' if impact.blocks_writes else 'ok':<8}{impact.table or '':<16}{row_count:>12}  {statement}")
+        if impact.note:
+            print(f"{'':<55}  ^ {impact.note}")
+
+    blocking = blocking_existing_tables(statements, rows)
+    print(f"\n{len(impacts)} locking statements, {len(blocking)} block writes on existing tables")
+
+
+if __name__ == "__main__":
+    main()
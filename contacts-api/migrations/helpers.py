@@ -0,0 +1,337 @@
+"""
+Допоміжні операції для міграцій, що мінімізують блокування на PostgreSQL.
+
+* ``create_index`` / ``drop_index`` — ``CREATE/DROP INDEX CONCURRENTLY`` поза
+  транзакцією міграції: таблиця лишається доступною для читання і запису.
+* ``backfill_in_batches`` — заповнення нової колонки пакетами, кожен у власній
+  транзакції, щоб не тримати блокування рядків до кінця міграції.
+* ``execute_with_lock_timeout`` — інструкції, що коротко блокують запис або
+  читання, виконуються з ``lock_timeout`` і повторами, щоб не тримати чергу
+  запитів за собою, поки самі чекають на блокування.
+* ``set_not_null`` — ``NOT NULL`` через перевірене ``CHECK``-обмеження замість
+  сканування таблиці під ``ACCESS EXCLUSIVE``.
+* ``estimate_lock_impact`` — класифікація SQL за режимом блокування, яку
+  використовує ``python -m migrations.dry_run``.
+
+На інших СУБД (SQLite у тестах) операції виконуються звичайним способом.
+"""
+import re
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import List, Optional
+
+import sqlalchemy as sa
+from alembic import context, op
+from sqlalchemy.exc import DBAPIError
+
+from app.config import get_settings
+
+# SQLSTATE lock_not_available: інструкція не дочекалася блокування за lock_timeout
+LOCK_NOT_AVAILABLE = "55P03"
+LOCK_TIMEOUT = "2s"
+LOCK_ATTEMPTS = 5
+# Пауза перед повтором, секунди; зростає з кожною спробою
+LOCK_RETRY_DELAY = 1.0
+
+
+def is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def contacts_partitions() -> int:
+    """
+    Кількість хеш-секцій таблиці contacts: ``-x partitions=N`` або ``Settings.contacts_partitions``.
+    """
+    x_arguments = context.get_x_argument(as_dictionary=True)
+    if "partitions" in x_arguments:
+        return int(x_arguments["partitions"])
+    return get_settings().contacts_partitions
+
+
+def table_partitions(table: str) -> List[str]:
+    """
+    Повертає секції таблиці на PostgreSQL або порожній список для звичайної таблиці.
+
+    У режимі ``--sql`` підключення немає, тому для ``contacts`` використовуються
+    імена секцій ``contacts_p{N}`` з ``contacts_partitions()``.
+    """
+    if not is_postgresql():
+        return []
+    if context.is_offline_mode():
+        return [f"{table}_p{remainder}" for remainder in range(contacts_partitions())] if table == "contacts" else []
+    result = op.get_bind().execute(sa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": table})
+    return [row[0] for row in result]
+
+
+def index_state(name: str) -> Optional[bool]:
+    """
+    Перевіряє ``pg_index.indisvalid`` індексу на PostgreSQL.
+
+    У режимі ``--sql`` підключення немає, тож індекс вважається відсутнім.
+
+    :param name: Назва індексу
+    :return: ``None``, якщо індексу немає; ``False`` для невалідного залишку перерваної побудови
+    """
+    if context.is_offline_mode():
+        return None
+    return op.get_bind().execute(sa.text(
+        "SELECT pg_index.indisvalid FROM pg_index "
+        "JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name"
+    ), {"name": name}).scalar()
+
+
+def create_index(name: str, table: str, columns: List[str], unique: bool = False) -> None:
+    """
+    Створює індекс; на PostgreSQL — ``CONCURRENTLY`` без блокування запису.
+
+    ``CREATE INDEX CONCURRENTLY`` не можна виконати в транзакції, тому він
+    виконується в ``autocommit_block``. Якщо побудова перервалася, PostgreSQL
+    лишає невалідний індекс: такий залишок видаляється і будується заново, а
+    валідний індекс (повторний запуск міграції) лишається як є.
+
+    Секціоновану таблицю не можна індексувати ``CONCURRENTLY`` напряму: індекс
+    створюється ``ON ONLY`` на батьківській таблиці (вона не містить рядків),
+    потім ``CONCURRENTLY`` на кожній секції, після чого секційні індекси
+    приєднуються до батьківського.
+    """
+    if not is_postgresql():
+        op.create_index(name, table, columns, unique=unique)
+        return
+
+    partitions = table_partitions(table)
+    column_list = ", ".join(columns)
+    unique_sql = "UNIQUE " if unique else ""
+    with op.get_context().autocommit_block():
+        if not partitions:
+            if _prepare_concurrent_build(name):
+                op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+            return
+
+        execute_with_lock_timeout(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON ONLY {table} ({column_list})")
+        for partition in partitions:
+            partition_index = f"{partition}_{name}"
+            if _prepare_concurrent_build(partition_index):
+                op.execute(f"CREATE {unique_sql}INDEX CONCURRENTLY {partition_index} ON {partition} ({column_list})")
+            # Повторне приєднання вже приєднаного індексу нічого не змінює
+            execute_with_lock_timeout(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def _prepare_concurrent_build(name: str) -> bool:
+    # Видаляє невалідний залишок перерваної побудови; False — валідний індекс уже є
+    valid = index_state(name)
+    if valid:
+        return False
+    if valid is not None:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+    return True
+
+
+def drop_index(name: str, table: str) -> None:
+    if not is_postgresql():
+        op.drop_index(name, table_name=table)
+        return
+    with op.get_context().autocommit_block():
+        if table_partitions(table):
+            # Індекс секціонованої таблиці видаляється разом із секційними, але без CONCURRENTLY
+            execute_with_lock_timeout(f"DROP INDEX IF EXISTS {name}")
+        else:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def execute_with_lock_timeout(statement: str, attempts: int = LOCK_ATTEMPTS) -> None:
+    """
+    Виконує інструкцію з ``lock_timeout`` і повторює її, якщо блокування не дочекалася.
+
+    Інструкція, що чекає на ``ACCESS EXCLUSIVE`` за довгим читанням, ставить у
+    чергу за собою всі нові запити до таблиці. З ``lock_timeout`` вона
+    відступає, запити проходять, а спроба повторюється після паузи. Кожна
+    спроба — окрема транзакція, тож викликати слід в ``autocommit_block``.
+
+    Для ``CREATE INDEX CONCURRENTLY`` і ``VALIDATE CONSTRAINT`` не
+    використовується: їхні блокування не заважають читанню і запису, а
+    ``CONCURRENTLY`` чекає на старі транзакції і від ``lock_timeout`` лише
+    лишав би невалідний індекс.
+
+    :param statement: SQL-інструкція
+    :param attempts: Кількість спроб, після якої помилка передається далі
+    """
+    op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                op.execute(statement)
+                return
+            except DBAPIError as exc:
+                if attempt == attempts or getattr(exc.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                    raise
+                time.sleep(LOCK_RETRY_DELAY * attempt)
+    finally:
+        op.execute("RESET lock_timeout")
+
+
+def set_not_null(table: str, column: str, existing_type: sa.types.TypeEngine) -> None:
+    """
+    Забороняє ``NULL`` у колонці; на PostgreSQL — без довгого блокування запису.
+
+    Сам ``SET NOT NULL`` перевіряє всі рядки під ``ACCESS EXCLUSIVE``. Натомість
+    спершу додається ``CHECK (column IS NOT NULL) NOT VALID`` (коротке
+    ``ACCESS EXCLUSIVE`` без сканування), ``VALIDATE CONSTRAINT`` перевіряє рядки під
+    ``SHARE UPDATE EXCLUSIVE``, не блокуючи запис, а ``SET NOT NULL``
+    (PostgreSQL 12+) спирається на перевірене обмеження і не сканує таблицю.
+    Кожна інструкція фіксується окремо (``autocommit_block``), щоб блокування
+    не трималися до кінця міграції, а інструкції з ``ACCESS EXCLUSIVE``
+    виконуються з ``lock_timeout`` (``execute_with_lock_timeout``).
+
+    Секціонованій таблиці обмеження додаються на кожну секцію; на батьківській
+    таблиці, що не містить рядків, ``SET NOT NULL`` виконується останнім.
+
+    Колонка вже не повинна містити ``NULL``, див. ``backfill_in_batches``.
+
+    :param table: Таблиця
+    :param column: Колонка
+    :param existing_type: Тип колонки (потрібен для перестворення таблиці на SQLite)
+    """
+    if not is_postgresql():
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, existing_type=existing_type, nullable=False)
+        return
+
+    partitions = table_partitions(table)
+    with op.get_context().autocommit_block():
+        for target in partitions or [table]:
+            constraint = f"ck_{target}_{column}_not_null"
+            execute_with_lock_timeout(f"ALTER TABLE {target} DROP CONSTRAINT IF EXISTS {constraint}")
+            execute_with_lock_timeout(
+                f"ALTER TABLE {target} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {target} VALIDATE CONSTRAINT {constraint}")
+            execute_with_lock_timeout(f"ALTER TABLE {target} ALTER COLUMN {column} SET NOT NULL")
+            execute_with_lock_timeout(f"ALTER TABLE {target} DROP CONSTRAINT {constraint}")
+        if partitions:
+            execute_with_lock_timeout(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+
+
+def backfill_in_batches(table: str, column: str, value: str, key: str = "id", batch_size: int = 10_000,
+                        where: Optional[str] = None) -> int:
+    """
+    Заповнює ``column`` значенням ``value`` пакетами по ``batch_size`` рядків.
+
+    На PostgreSQL кожен пакет фіксується окремо (``autocommit_block``), тож
+    блокуються лише рядки поточного пакета. Пакети йдуть за зростанням ``key``
+    від останнього обробленого значення, тож кожен пакет продовжує обхід
+    індексу, а не починає його з початку таблиці. У режимі ``--sql``
+    виводиться одна інструкція для першого пакета, оскільки кількість
+    змінених рядків невідома.
+
+    :param table: Таблиця
+    :param column: Колонка, що заповнюється; оновлюються рядки, де вона ``NULL``
+    :param value: SQL-вираз нового значення
+    :param key: Унікальна індексована колонка, за якою вибираються рядки пакета
+    :param batch_size: Розмір пакета
+    :param where: Додаткова умова відбору рядків
+    :return: Кількість оновлених рядків (0 у режимі ``--sql``)
+    """
+    condition = f"{column} IS NULL" + (f" AND ({where})" if where else "")
+
+    def batch(after: str = "") -> sa.TextClause:
+        return sa.text(
+            f"UPDATE {table} SET {column} = {value} "
+            f"WHERE {key} IN (SELECT {key} FROM {table} WHERE {after}{condition} "
+            f"ORDER BY {key} LIMIT {int(batch_size)}) RETURNING {key}"
+        )
+
+    if context.is_offline_mode():
+        op.execute(batch())
+        return 0
+
+    updated = 0
+    statement, parameters = batch(), {}
+    migration_context = op.get_context()
+    with migration_context.autocommit_block() if is_postgresql() else nullcontext():
+        while True:
+            keys = op.get_bind().execute(statement, parameters).scalars().all()
+            updated += len(keys)
+            if len(keys) < batch_size:
+                return updated
+            statement, parameters = batch(f"{key} > :last AND "), {"last": max(keys)}
+
+
+@dataclass
+class LockImpact:
+    statement: str
+    lock: str
+    blocks_reads: bool
+    blocks_writes: bool
+    note: str = ""
+    table: Optional[str] = None
+
+
+# (шаблон, режим блокування, блокує читання, блокує запис, примітка); перший збіг перемагає
+_LOCK_RULES = [
+    (r"^CREATE (UNIQUE )?INDEX CONCURRENTLY", "SHARE UPDATE EXCLUSIVE", False, False, "online index build"),
+    (r"^CREATE (UNIQUE )?INDEX .* ON ONLY", "SHARE", False, True, "partitioned parent only, brief"),
+    (r"^ALTER INDEX .* ATTACH PARTITION", "SHARE UPDATE EXCLUSIVE", False, False, "brief"),
+    (r"^DROP INDEX CONCURRENTLY", "SHARE UPDATE EXCLUSIVE", False, False, ""),
+    (r"^CREATE (UNIQUE )?INDEX", "SHARE", False, True, "writes wait for the whole index build"),
+    (r"^DROP INDEX", "ACCESS EXCLUSIVE", True, True, "brief"),
+    (r"^CREATE (TABLE|SEQUENCE)", "none", False, False, "new object"),
+    (r"^ALTER SEQUENCE", "none", False, False, ""),
+    (r"^DROP TABLE", "ACCESS EXCLUSIVE", True, True, ""),
+    (r"^ALTER TABLE .* VALIDATE CONSTRAINT", "SHARE UPDATE EXCLUSIVE", False, False, "scans the table"),
+    # NOT VALID не сканує таблицю, але режим блокування залежить від типу обмеження
+    (r"^ALTER TABLE .* ADD CONSTRAINT .* FOREIGN KEY .* NOT VALID", "SHARE ROW EXCLUSIVE", False, True, "brief"),
+    (r"^ALTER TABLE .* ADD CONSTRAINT .* CHECK .* NOT VALID", "ACCESS EXCLUSIVE", True, True, "brief, no scan"),
+    (r"^ALTER TABLE .* ADD CONSTRAINT .* FOREIGN KEY", "SHARE ROW EXCLUSIVE", False, True,
+     "scans the table; prefer NOT VALID + VALIDATE"),
+    (r"^ALTER TABLE .* ALTER COLUMN .* TYPE", "ACCESS EXCLUSIVE", True, True, "may rewrite the table"),
+    (r"^ALTER TABLE .* SET NOT NULL", "ACCESS EXCLUSIVE", True, True,
+     "scans the table unless a valid CHECK (... IS NOT NULL) exists"),
+    (r"^ALTER TABLE .* DROP CONSTRAINT", "ACCESS EXCLUSIVE", True, True, "brief"),
+    (r"^ALTER TABLE .* ADD COLUMN .* DEFAULT .*\(", "ACCESS EXCLUSIVE", True, True,
+     "volatile default rewrites the table"),
+    (r"^ALTER TABLE .* ADD COLUMN", "ACCESS EXCLUSIVE", True, True, "brief, metadata only"),
+    (r"^ALTER TABLE", "ACCESS EXCLUSIVE", True, True, ""),
+    (r"^(UPDATE|DELETE|INSERT)", "ROW EXCLUSIVE", False, False, "locks touched rows"),
+    (r"^VACUUM FULL", "ACCESS EXCLUSIVE", True, True, "rewrites the table"),
+    (r"^(BEGIN|COMMIT|SELECT|SET|RESET)\b", "none", False, False, ""),
+]
+
+_TABLE_PATTERNS = [
+    r"^CREATE (?:UNIQUE )?INDEX .*?\bON (?:ONLY )?(\w+)",
+    r"^ALTER TABLE (?:IF EXISTS )?(?:ONLY )?(\w+)",
+    r"^(?:DROP|CREATE) TABLE (?:IF (?:NOT )?EXISTS )?(\w+)",
+    r"^UPDATE (\w+)",
+    r"^DELETE FROM (\w+)",
+    r"^INSERT INTO (\w+)",
+    r"^VACUUM (?:FULL )?(\w+)",
+]
+
+
+def estimate_lock_impact(statement: str) -> LockImpact:
+    """
+    Оцінює, яке блокування PostgreSQL візьме інструкція і що воно блокує.
+
+    Оцінка консервативна: невідомі інструкції вважаються такими, що беруть
+    ``ACCESS EXCLUSIVE``.
+
+    :param statement: SQL-інструкція
+    :return: ``LockImpact`` з режимом блокування та таблицею
+    """
+    normalized = " ".join(statement.split()).rstrip(";")
+    upper = normalized.upper()
+    table = None
+    for pattern in _TABLE_PATTERNS:
+        match = re.search(pattern, normalized, re.IGNORECASE)
+        if match:
+            table = match.group(1)
+            break
+    for pattern, lock, blocks_reads, blocks_writes, note in _LOCK_RULES:
+        if re.search(pattern, upper):
+            return LockImpact(normalized, lock, blocks_reads, blocks_writes, note, table)
+    return LockImpact(normalized, "ACCESS EXCLUSIVE", True, True, "unknown statement", table)
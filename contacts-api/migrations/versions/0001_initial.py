@@ -0,0 +1,73 @@
+"""initial schema: users and contacts
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-10-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitioning import partitioned_table_ddl
+from migrations.helpers import contacts_partitions, is_postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONTACT_INDEXES = ["id", "first_name", "last_name", "email", "user_email"]
+
+
+def users_columns():
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+def contacts_columns():
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=True),
+        sa.Column("last_name", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("birthday", sa.Date(), nullable=True),
+        sa.Column("additional_data", sa.String(), nullable=True),
+        sa.Column("user_email", sa.String(), sa.ForeignKey("users.email"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table("users", *users_columns())
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    partitions = contacts_partitions() if is_postgresql() else 0
+    if partitions > 0:
+        # Знімок таблиці на момент ревізії, а не поточна модель
+        metadata = sa.MetaData()
+        sa.Table("users", metadata, *users_columns())
+        contacts = sa.Table("contacts", metadata, *contacts_columns(), info={"partition_key": "user_email"})
+        for column in CONTACT_INDEXES:
+            sa.Index(f"ix_contacts_{column}", contacts.c[column])
+        for statement in partitioned_table_ddl(contacts, partitions):
+            op.execute(statement)
+    else:
+        op.create_table("contacts", *contacts_columns())
+        for column in CONTACT_INDEXES:
+            op.create_index(f"ix_contacts_{column}", "contacts", [column])
+
+
+def downgrade() -> None:
+    op.drop_table("contacts")
+    op.drop_table("users")
@@ -0,0 +1,26 @@
+"""index contacts by owner and name
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Будується CONCURRENTLY: contacts лишається доступною для запису
+    create_index("ix_contacts_owner_name", "contacts", ["user_email", "last_name", "first_name", "id"])
+
+
+def downgrade() -> None:
+    drop_index("ix_contacts_owner_name", "contacts")
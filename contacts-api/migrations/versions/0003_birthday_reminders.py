@@ -0,0 +1,39 @@
+"""birthday reminder checkpoints and deliveries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Нові таблиці: блокування наявних таблиць не потрібне
+    op.create_table(
+        "reminder_checkpoints",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("last_date", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.create_table(
+        "reminder_deliveries",
+        sa.Column("occurs_on", sa.Date(), nullable=False),
+        sa.Column("user_email", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("occurs_on", "user_email"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reminder_deliveries")
+    op.drop_table("reminder_checkpoints")
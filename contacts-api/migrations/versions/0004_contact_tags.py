@@ -0,0 +1,51 @@
+"""contact tags with owner-scoped membership
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ціль складеного зовнішнього ключа; будується CONCURRENTLY, contacts лишається доступною для запису
+    create_index("ix_contacts_id_owner", "contacts", ["id", "user_email"], unique=True)
+
+    # Нові таблиці; зовнішні ключі на порожніх таблицях не сканують contacts
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_email", sa.String(), sa.ForeignKey("users.email"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_email", "name", name="uq_tags_owner_name"),
+    )
+    op.create_table(
+        "contact_tags",
+        sa.Column("user_email", sa.String(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("contact_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_email", "tag_id", "contact_id"),
+        sa.ForeignKeyConstraint(["contact_id", "user_email"], ["contacts.id", "contacts.user_email"],
+                                ondelete="CASCADE"),
+    )
+    op.create_index("ix_contact_tags_owner_contact", "contact_tags", ["user_email", "contact_id", "tag_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("contact_tags")
+    op.drop_table("tags")
+    drop_index("ix_contacts_id_owner", "contacts")
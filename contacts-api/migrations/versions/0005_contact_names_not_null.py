@@ -0,0 +1,37 @@
+"""contact first and last names are not null
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-10-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import backfill_in_batches, set_not_null
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NAME_COLUMNS = ["last_name", "first_name"]
+
+
+def upgrade() -> None:
+    # Ключ сортування списку контактів не може містити NULL: курсор не кодує
+    # відсутнє ім'я, а порівняння кортежів пропускає такі рядки
+    for column in NAME_COLUMNS:
+        backfill_in_batches("contacts", column, "''")
+        set_not_null("contacts", column, sa.String())
+
+
+def downgrade() -> None:
+    # Зняття NOT NULL змінює лише метадані
+    with op.batch_alter_table("contacts") as batch:
+        for column in NAME_COLUMNS:
+            batch.alter_column(column, existing_type=sa.String(), nullable=True)
@@ -0,0 +1,33 @@
+"""birthday reminder delivery failures
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-10-22 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Нова таблиця: блокування наявних таблиць не потрібне
+    op.create_table(
+        "reminder_failures",
+        sa.Column("occurs_on", sa.Date(), nullable=False),
+        sa.Column("user_email", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("occurs_on", "user_email"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reminder_failures")